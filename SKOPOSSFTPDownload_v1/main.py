@@ -2,23 +2,285 @@
 AyxPlugin (required) has-a IncomingInterface (optional).
 Although defining IncomingInterface is optional, the interface methods are needed if an upstream tool exists.
 """
-import pysftp
+import paramiko
 import sys
 
 #raise Exception(sys.version)
 #
-#raise Exception(vars(pysftp).keys())
+#raise Exception(vars(paramiko).keys())
 
 import re
+import errno
 import os
+import stat
 import AlteryxPythonSDK as Sdk
 import xml.etree.ElementTree as Et
 
-import base64
-from datetime import datetime
+import io
+import queue
+import shutil
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 REGEX_HOSTNAME = r"^(([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9])\.)*([A-Za-z0-9]|[A-Za-z0-9][A-Za-z0-9\-]*[A-Za-z0-9])$"
+HOSTNAME_RE = re.compile(REGEX_HOSTNAME)
+# Number of parallel SFTP connections used for downloading, unless set in the GUI
+DEFAULT_CONCURRENCY = 8
+# OpenSSH starts dropping connections once 10 are authenticating at the same time (MaxStartups),
+# which happens when all workers connect at once
+MAX_CONCURRENCY = 8
+# Errors of a transfer in a worker thread, including opening its connection
+TRANSFER_ERRORS = (IOError, paramiko.SSHException)
+# Host keys of known servers, as used by OpenSSH
+KNOWN_HOSTS_FILE = os.path.join(os.path.expanduser('~'), '.ssh', 'known_hosts')
+# Private key types tried for a key file, in this order
+PRIVATE_KEY_CLASSES = (paramiko.RSAKey, paramiko.ECDSAKey, paramiko.Ed25519Key, paramiko.DSSKey)
+# Flow-control window of all SFTP channels. Paramiko's default of 2 MiB stalls transfers on links
+# with a high bandwidth-delay product, as the server has to wait for window adjustments.
+SFTP_WINDOW_SIZE = 1 << 24
+# Write buffer for downloaded files and chunk size for copying them, Python's default of 8 KiB
+# means a lot of small writes
+LOCAL_BUFFER_SIZE = 1 << 20
+# Skipped directory entries reported individually, the rest is summarized in one message
+MAX_SKIP_MESSAGES = 5
+# Socket buffers for bulk transfers, large enough for the bandwidth-delay product of WAN links
+SOCKET_BUFFER_SIZE = 1 << 22
+# Seconds between keepalive packets, so idle connections are not dropped by NAT gateways and firewalls
+KEEPALIVE_INTERVAL = 30
+# Successfully processed files are reported in batches of this size instead of one message each
+MESSAGE_BATCH_SIZE = 100
+
+
+def _format_timestamp(timestamp: int) -> str:
+    """Formats a UNIX timestamp as UTC date and time for Alteryx.
+
+    Considerably faster than datetime.utcfromtimestamp().strftime(), which matters when listing large directories.
+    :param timestamp: Seconds since epoch
+    :type timestamp: int
+    :return: Date and time as "YYYY-MM-DD hh:mm:ss"
+    :rtype: str
+    """
+    t = time.gmtime(int(timestamp))
+    return "%04d-%02d-%02d %02d:%02d:%02d" % (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+
+
+def _stat_or_none(path: str) -> os.stat_result:
+    """Stats a local path, so existence and type can be checked with a single system call.
+
+    :param path: Local path
+    :type path: str
+    :return: Result of os.stat, None if the path does not exist
+    :rtype: os.stat_result
+    """
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+# Parsed known_hosts, shared by all connections of the process, and the modification time it was read at
+_host_keys = None
+_host_keys_mtime = None
+_host_keys_lock = threading.Lock()
+
+
+def _load_host_keys() -> paramiko.HostKeys:
+    """Reads the host keys of known servers.
+
+    known_hosts is only parsed again if it has changed since, every connection would read it otherwise.
+    :return: Host keys from known_hosts, empty if the file does not exist
+    :rtype: paramiko.HostKeys
+    """
+    global _host_keys, _host_keys_mtime
+    hosts_stat = _stat_or_none(KNOWN_HOSTS_FILE)
+    mtime = hosts_stat.st_mtime_ns if hosts_stat is not None else None
+    with _host_keys_lock:
+        if _host_keys is None or mtime != _host_keys_mtime:
+            _host_keys = paramiko.HostKeys()
+            try:
+                _host_keys.load(KNOWN_HOSTS_FILE)
+            except IOError:
+                pass
+            _host_keys_mtime = mtime
+        return _host_keys
+
+
+def _load_private_key(key_filepath: str = None, passphrase: str = None) -> paramiko.PKey:
+    """Reads a private key in OpenSSH format.
+
+    Without a key file, the default key of OpenSSH is used if there is one.
+    :param key_filepath: Path of the key file
+    :type key_filepath: str
+    :param passphrase: Passphrase of the key file, if encrypted
+    :type passphrase: str
+    :raises paramiko.AuthenticationException: If there is no key file
+    :raises paramiko.SSHException: If the key file could not be read
+    :return: Private key
+    :rtype: paramiko.PKey
+    """
+    if not key_filepath:
+        for default_key in ('id_rsa', 'id_dsa'):
+            default_path = os.path.join(os.path.expanduser('~'), '.ssh', default_key)
+            if os.path.exists(default_path):
+                key_filepath = default_path
+                break
+        else:
+            raise paramiko.AuthenticationException("No password or key specified.")
+
+    # The key type is not known beforehand, each class refuses keys of other types
+    for key_class in PRIVATE_KEY_CLASSES:
+        try:
+            return key_class.from_private_key_file(key_filepath, passphrase)
+        except paramiko.PasswordRequiredException:
+            raise
+        except paramiko.SSHException:
+            continue
+    raise paramiko.SSHException("Key file {} could not be read. Please check key type and passphrase.".format(key_filepath))
+
+
+def _open_socket(hostname: str, port: int) -> socket.socket:
+    """Connects a TCP socket to the server, set up for bulk transfers.
+
+    :param hostname: Hostname of the server
+    :type hostname: str
+    :param port: Port of the server
+    :type port: int
+    :raises OSError: If no address of the server could be connected
+    :return: Connected socket
+    :rtype: socket.socket
+    """
+    last_error = socket.gaierror("No address found for {}".format(hostname))
+    for family, socktype, proto, _, address in socket.getaddrinfo(hostname, port, 0, socket.SOCK_STREAM):
+        sock = socket.socket(family, socktype, proto)
+        try:
+            # Buffer sizes have to be set before connecting, as the TCP window scale is negotiated then
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            # SSH sends complete packets, do not hold back small ones (Nagle's algorithm)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            last_error = e
+            sock.close()
+    raise last_error
+
+
+def _close_connection(sftp_client: paramiko.SFTPClient):
+    """Closes an SFTP client together with the SSH connection it runs on.
+
+    :param sftp_client: SFTP client from AyxPlugin._make_connection()
+    :type sftp_client: paramiko.SFTPClient
+    """
+    transport = sftp_client.get_channel().get_transport()
+    sftp_client.close()
+    transport.close()
+
+
+class SFTPConnectionPool:
+    """
+    Keeps up to a fixed number of SFTP connections, which are opened on demand and reused afterwards.
+    Each connection is only used by one thread at a time, as paramiko's SFTPClient is not thread-safe.
+    """
+
+    def __init__(self, factory: object, size: int):
+        """
+        Constructor for SFTPConnectionPool.
+        :param factory: Callable opening a new connection, must not call into the Alteryx engine
+        :param size: Maximum number of connections
+        """
+        self._factory = factory
+        # Free slots are None until a connection is needed. LIFO, so idle connections are reused
+        # before opening another one.
+        self._idle = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(None)
+        self._connections = list()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """Borrows a connection, waiting if all of them are in use.
+
+        :return: Context manager yielding a paramiko.SFTPClient, released when leaving the context
+        """
+        conn = self._idle.get()
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                self._idle.put(None)
+                raise
+            with self._lock:
+                self._connections.append(conn)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def release(self, conn: paramiko.SFTPClient):
+        """Returns a connection to the pool. Broken connections are closed and replaced on demand.
+
+        :param conn: Connection taken from acquire()
+        :type conn: paramiko.SFTPClient
+        """
+        if conn.get_channel().get_transport().is_active():
+            self._idle.put(conn)
+            return
+        with self._lock:
+            self._connections.remove(conn)
+        _close_connection(conn)
+        self._idle.put(None)
+
+    def close_all(self):
+        """Closes all connections. The pool must not be in use anymore."""
+        with self._lock:
+            for conn in self._connections:
+                _close_connection(conn)
+            self._connections = list()
+
+
+class MessageAggregator:
+    """
+    Collects the names of successfully processed files and reports them in batches, as every message
+    is a call into the Alteryx engine. Must only be used from the thread the engine called us on.
+    """
+
+    def __init__(self, plugin: object, prefix: str, batch_size: int = MESSAGE_BATCH_SIZE):
+        """
+        Constructor for MessageAggregator.
+        :param plugin: AyxPlugin showing the messages
+        :param prefix: Start of each message, followed by the file names
+        :param batch_size: Number of file names per message
+        """
+        self._plugin = plugin
+        self._prefix = prefix
+        self._batch_size = batch_size
+        self._names = list()
+        self.total = 0
+
+    def add(self, name: str):
+        """Adds a file, the message is shown once the batch is full.
+
+        :param name: Name of the file
+        :type name: str
+        """
+        self._names.append(name)
+        self.total += 1
+        if len(self._names) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Shows a message for the files collected so far."""
+        if self._names:
+            self._plugin.output_message('{} {}'.format(self._prefix, ', '.join(self._names)), messageType=Sdk.Status.info)
+            self._names = list()
+
 
 class AyxPlugin:
     """
@@ -69,6 +331,14 @@ class AyxPlugin:
             'blobfield': 'DownloadedData'
         })
         self.file_handling = self.FileHandling.NONE_HANDLING
+        # Modes as plain flags for the per-file code paths
+        self._is_list = False
+        self._is_blob = False
+        self._is_path = False
+        self._delete_files = False
+        self._move_files = False
+        # Number of files transferred in parallel
+        self.concurrency = DEFAULT_CONCURRENCY
         # Incoming Interface settings
         self.incoming_field = None
 
@@ -77,21 +347,45 @@ class AyxPlugin:
         self.input_recordinfo = None
         self.output_anchor = None
         self.output_recordinfo = None
+        self._record_info_cache = dict()
+        # Settings and result of the last validation
+        self._settings_validated = None
+
+        # SFTP client of the main connection
+        self._sftp = None
+        # Remote working directory and target for moving files, resolved once per connection
+        self._remote_cwd = None
+        self._move_target = None
+        # Parallel downloads: connections used by the worker threads
+        self.pool = None
+        # Moving/deleting files on the server: one background thread with its own SFTP channel
+        self._handling_queue = None
+        self._handling_thread = None
+        self._handling_messages = list()
+        self._handled_files = list()
 
     def validate_settings(self, silent=False) -> bool:
         """Validate settings
         Checks whether the settings made in the GUI are valid and provides error messages otherwise.
         
+        Settings do not change while records are processed, so the result is reused as long as
+        they are the same. A failed validation is repeated if its messages are to be shown.
         :return: Status of validation
         :rtype: bool
         """
+        settings_key = (tuple(sorted(self.sftp_settings.items())), self.tool_mode, self.file_handling,
+                        tuple(sorted(self.output_settings.items())), self.incoming_field, self.input_optional is not None)
+        if self._settings_validated is not None and self._settings_validated[0] == settings_key:
+            if silent or self._settings_validated[1]:
+                return self._settings_validated[1]
+
         validation_result = True
         # Validate the settings
         if not self.sftp_settings['hostname']:
             if not silent:
                 self.output_message('Please enter a hostname.')
             validation_result = False
-        elif not re.match(REGEX_HOSTNAME, self.sftp_settings['hostname']):
+        elif not HOSTNAME_RE.match(self.sftp_settings['hostname']):
             if not silent:
                 self.output_message('Please enter a valid hostname without protocol, user or port.')
             validation_result = False
@@ -136,20 +430,22 @@ class AyxPlugin:
 
         # Check if paths are existent
         if self.sftp_settings['key_filepath']: 
-            if not os.path.exists(self.sftp_settings['key_filepath']):
+            key_stat = _stat_or_none(self.sftp_settings['key_filepath'])
+            if key_stat is None:
                 if not silent:
                     self.output_message('The keyfile could not be found. Please check file path.')
                 validation_result = False
-            elif not os.path.isfile(self.sftp_settings['key_filepath']):
+            elif not stat.S_ISREG(key_stat.st_mode):
                 if not silent:
                     self.output_message('The path for the keyfile is not a file. Please specify a filename.')
                 validation_result = False
         if self.tool_mode == self.ToolMode.DOWNLOAD_TO_PATH and self.output_settings['local_path']:
-            if not os.path.exists(self.output_settings['local_path']):
+            local_stat = _stat_or_none(self.output_settings['local_path'])
+            if local_stat is None:
                 if not silent:
                     self.output_message('The specified path for the output does not exist. Please create the folder or enter a different path.')
                 validation_result = False
-            elif not os.path.isdir(self.output_settings['local_path']):
+            elif not stat.S_ISDIR(local_stat.st_mode):
                 if not silent:
                     self.output_message('The output path is not a directory. Please enter a directory.')
                 validation_result = False
@@ -160,6 +456,7 @@ class AyxPlugin:
                 self.output_message('Please select a field from the incoming data containing file/folder names.')
             validation_result = False
 
+        self._settings_validated = (settings_key, validation_result)
         return validation_result
 
     def _list_to_recordinfo(self, rec_info: Sdk.RecordInfo, field_list: list, source: str = "SFTP Downloader"):
@@ -177,14 +474,11 @@ class AyxPlugin:
 
         return
 
-    def build_ayx_output(self, push_metadata: bool = True):
-        """Generates everything needed to push data downstream.
+    def _build_recordinfo(self):
+        """Builds the RecordInfo for the current tool mode.
 
-        Creates Record Info construct and Record Creator along with a dictionary containing the indices.
-        :param push_metadata: If True, meta-data will automatically pushed downstream
-        :type push_metadata: bool
-        :return: Tuple of RecordInfo, RecordCreator, list()
-        :rtype: RecordInfo, RecordCreator, list
+        :return: Tuple of RecordInfo, dict() of fields by name
+        :rtype: RecordInfo, dict
         """
 
         rec_info = Sdk.RecordInfo(self.alteryx_engine)
@@ -225,6 +519,26 @@ class AyxPlugin:
         # Add fields to RecordInfo object
         self._list_to_recordinfo(rec_info, field_list, source="SFTP Downloader: {}".format(self.sftp_settings['hostname']))
 
+        # Resolve the field objects by name once, so records can be filled without looking them up again
+        field_dict = {a['name']: rec_info[idx] for idx, a in enumerate(field_list)}
+
+        return rec_info, field_dict
+
+    def build_ayx_output(self, push_metadata: bool = True):
+        """Generates everything needed to push data downstream.
+
+        Creates Record Info construct and Record Creator along with a dictionary containing the fields.
+        The RecordInfo only depends on the settings, so it is built once and reused afterwards.
+        :param push_metadata: If True, meta-data will automatically pushed downstream
+        :type push_metadata: bool
+        :return: Tuple of RecordInfo, RecordCreator, dict() of fields by name
+        :rtype: RecordInfo, RecordCreator, dict
+        """
+        cache_key = (self.tool_mode, self.output_settings['blobfield'], self.sftp_settings['hostname'])
+        if cache_key not in self._record_info_cache:
+            self._record_info_cache[cache_key] = self._build_recordinfo()
+        rec_info, field_dict = self._record_info_cache[cache_key]
+
         # Push meta data downstream
         if push_metadata:
             self.output_anchor.init(rec_info)
@@ -232,116 +546,242 @@ class AyxPlugin:
         # Get a record creator
         rec_creator = rec_info.construct_record_creator()
 
-        # Generate a list of names and IDs, so we can make sure to fill the right fields
-        field_dict = {a['name']: idx for idx, a in enumerate(field_list)}
-
         return rec_info, rec_creator, field_dict
   
-    def _init_sftp(self) -> pysftp.Connection:
+    def _make_connection(self, cwd: str = None) -> paramiko.SFTPClient:
+        """Opens a new connection to the SFTP server.
+
+        Does not call into the Alteryx engine, so it can be used from worker threads. The host key
+        of an unknown host is accepted and cached to known_hosts.
+        :param cwd: Remote working directory to change to, if any
+        :type cwd: str
+        :return: SFTP client on its own SSH connection
+        :rtype: paramiko.SFTPClient
+        """
+        hostname = self.sftp_settings['hostname']
+        # SFTP Security: Check for known_hosts
+        host_keys = _load_host_keys()
+        known_keys = host_keys.lookup(hostname)
+
+        transport = paramiko.Transport(_open_socket(hostname, self.sftp_settings['port']))
+        try:
+            transport.set_keepalive(KEEPALIVE_INTERVAL)
+            transport.use_compression(False)
+            # Applies to all SFTP channels opened from now on
+            transport.default_window_size = SFTP_WINDOW_SIZE
+            # A password takes precedence over the key file
+            pkey = None
+            if self.sftp_settings['password'] is None:
+                pkey = _load_private_key(self.sftp_settings['key_filepath'], self.sftp_settings['key_passphrase'])
+            # DANGER: Without a known host key, any key is accepted
+            transport.connect(hostkey=next(iter(known_keys.values())) if known_keys is not None else None,
+                              username=self.sftp_settings['username'],
+                              password=self.sftp_settings['password'],
+                              pkey=pkey)
+            sftp_client = paramiko.SFTPClient.from_transport(transport)
+        except Exception:
+            transport.close()
+            raise
+
+        # Add host to known_hosts if not known yet
+        if known_keys is None:
+            server_key = transport.get_remote_server_key()
+            host_keys.add(hostname, server_key.get_name(), server_key)
+            # Create necessary directories if not yet available
+            if not os.path.exists(os.path.dirname(KNOWN_HOSTS_FILE)):
+                os.mkdir(os.path.dirname(KNOWN_HOSTS_FILE))
+            host_keys.save(KNOWN_HOSTS_FILE)
+
+        if cwd:
+            sftp_client.chdir(cwd)
+        return sftp_client
+
+    def _init_sftp(self) -> paramiko.SFTPClient:
         """Sets up the Connection to the SFTP server.
         
-        :return: An active connection object
-        :rtype: pysftp.Connection
+        :return: SFTP client of the main connection
+        :rtype: paramiko.SFTPClient
         """
         # SFTP Security: Check for known_hosts
-        sftp_cnopts = pysftp.CnOpts()
-        sftp_hosts = None
-        if sftp_cnopts.hostkeys.lookup(self.sftp_settings['hostname']) is None:
+        unknown_host = _load_host_keys().lookup(self.sftp_settings['hostname']) is None
+        if unknown_host:
             self.output_message("Unkown host {}. Any host key will be accepted.".format(self.sftp_settings['hostname']),
                                 messageType=Sdk.EngineMessageType.warning)
-            sftp_hosts = sftp_cnopts.hostkeys
-            # DANGER: Disable all key validation for all hosts
-            sftp_cnopts.hostkeys = None
 
         # Initiate connection
         try:
-            sftp_conn = pysftp.Connection(host=self.sftp_settings['hostname'],
-                                          port=self.sftp_settings['port'],
-                                          username=self.sftp_settings['username'],
-                                          password=self.sftp_settings['password'],
-                                          private_key=self.sftp_settings['key_filepath'],
-                                          private_key_pass=self.sftp_settings['key_passphrase'],
-                                          cnopts=sftp_cnopts)
-
-            # Add host to known_hosts if not known yet
-            if sftp_hosts != None:
+            sftp_conn = self._make_connection()
+            if unknown_host:
                 self.output_message("Connected to unknown host. Caching its hostkey to known_hosts.", messageType=Sdk.EngineMessageType.warning)
-                sftp_hosts.add(self.sftp_settings['hostname'], sftp_conn.remote_server_key.get_name(), sftp_conn.remote_server_key)
-                # Create necessary directories if not yet available
-                hosts_file = pysftp.helpers.known_hosts()
-                if not os.path.exists(os.path.dirname(hosts_file)):
-                    os.mkdir(os.path.dirname(hosts_file))
-                sftp_hosts.save(hosts_file)            
-        except pysftp.ConnectionException as e:
+        except (socket.gaierror, socket.timeout, ConnectionError):
             self.output_message("Could not connect to server. Please check settings.")
             return False
-        except pysftp.CredentialException as e:
-            self.output_message("Authentication failed. Please check credentials.")
-            return False
-        except pysftp.paramiko.BadAuthenticationType as e:
+        except paramiko.BadAuthenticationType as e:
             self.output_message("Unsupported Authentication Type: {}".format(e))
             return False
+        except paramiko.AuthenticationException:
+            self.output_message("Authentication failed. Please check credentials.")
+            return False
         except Exception as e:
             self.output_message("Connection error: {}".format(e))
             return False
 
+        self._sftp = sftp_conn
+
         # Change working directory
         self.output_message("Connected successfully to {}".format(self.sftp_settings['hostname']), messageType=Sdk.EngineMessageType.info)
-        if not sftp_conn.isdir(self.sftp_settings['remote_path']):
-            self.output_message('Remote path "{}" is not a directory.'.format(self.sftp_settings['remote_path']))
-            return False
         try:
-            sftp_conn.chdir(self.sftp_settings['remote_path'])
-        except IOError as e:
+            self._sftp.chdir(self.sftp_settings['remote_path'])
+        except IOError:
             self.output_message("Remote path does not exist: {}".format(self.sftp_settings['remote_path']))
+            _close_connection(sftp_conn)
+            return False
+        except paramiko.SFTPError:
+            self.output_message('Remote path "{}" is not a directory.'.format(self.sftp_settings['remote_path']))
+            _close_connection(sftp_conn)
             return False
+        # Normalized by chdir already, no need to ask the server again
+        self._remote_cwd = self._sftp.getcwd()
+
+        # The move target is the same for all files, so it is checked only once
+        self._move_target = None
+        if self.tool_mode != self.ToolMode.LIST_FILES and self.file_handling == self.FileHandling.MOVE_FILES:
+            try:
+                move_attr = self._sftp.stat(self.sftp_settings['move_path'])
+            except IOError:
+                self.output_message("The target folder {} does not exist.".format(self.sftp_settings['move_path']),
+                                    messageType=Sdk.EngineMessageType.warning)
+            else:
+                if not stat.S_ISDIR(move_attr.st_mode):
+                    self.output_message("The target folder {} is not a directory.".format(self.sftp_settings['move_path']),
+                                        messageType=Sdk.EngineMessageType.warning)
+                else:
+                    self._move_target = self._sftp.normalize(self.sftp_settings['move_path'])
+
+        # Further connections for the worker threads are opened when needed
+        remote_cwd = self._remote_cwd
+        self.pool = SFTPConnectionPool(lambda: self._make_connection(remote_cwd), self.concurrency)
 
         return sftp_conn
 
+    def _start_file_handling(self, transport: object):
+        """Starts the background thread moving/deleting downloaded files on the server.
+
+        Rename and remove requests cost a round trip each. Running them in the background keeps
+        them off the path of the next download. Nothing is started if files are kept, which is
+        also the case if the target folder for moving them is not usable (checked in _init_sftp).
+        :param transport: Transport of the main connection
+        :type transport: paramiko.Transport
+        """
+        if self._is_list or not (self._delete_files or (self._move_files and self._move_target is not None)):
+            return
+        self._handling_messages = list()
+        self._handled_files = list()
+        self._handling_queue = queue.Queue()
+        self._handling_thread = threading.Thread(target=self._file_handling_worker,
+                                                 args=(paramiko.SFTPClient.from_transport(transport),),
+                                                 daemon=True)
+        self._handling_thread.start()
+
+    def _file_handling_worker(self, sftp_client: object):
+        """Moves/deletes files taken from the queue until it receives None.
+
+        :param sftp_client: SFTP channel, only used by this thread
+        :type sftp_client: paramiko.SFTPClient
+        """
+        while True:
+            fattr = self._handling_queue.get()
+            if fattr is None:
+                break
+            handling_msg = self._handle_file(sftp_client, fattr)
+            if handling_msg:
+                self._handling_messages.append(handling_msg)
+            else:
+                self._handled_files.append(fattr.filename)
+        sftp_client.close()
+
+    def _queue_file_handling(self, fattr: object):
+        """Queues a downloaded file for being moved/deleted on the server.
+
+        :param fattr: Attributes of the remote file
+        :type fattr: paramiko.SFTPAttributes
+        """
+        if self._handling_queue is not None:
+            self._handling_queue.put(fattr)
+
+    def _finish_file_handling(self):
+        """Waits for all queued files to be moved/deleted and reports the outcome."""
+        if self._handling_thread is None:
+            return
+        self._handling_queue.put(None)
+        self._handling_thread.join()
+        self._handling_queue = None
+        self._handling_thread = None
+
+        for handling_msg in self._handling_messages:
+            self.output_message(*handling_msg)
+        self._handling_messages = list()
+
+        handled = MessageAggregator(self, 'Moved to {}:'.format(self._move_target) if self._move_files else 'Deleted from server:')
+        for filename in self._handled_files:
+            handled.add(filename)
+        handled.flush()
+        self._handled_files = list()
+
     def pi_init(self, str_xml: str):
         """
         Called when the Alteryx engine is ready to provide the tool configuration from the GUI.
         :param str_xml: The raw XML from the GUI.
         """
-        xml = Et.fromstring(str_xml)
+        settings = self._parse_xml_settings(Et.fromstring(str_xml))
 
         # Getting the user-entered settings from the GUI
         # SFTP Settings
-        self.sftp_settings['hostname'] = self._prep_xmltext(xml, 'Hostname')
-        self.sftp_settings['port'] = int(self._prep_xmltext(xml, 'Port'))
-        self.sftp_settings['username'] = self._prep_xmltext(xml, 'Username')
-        self.sftp_settings['password'] = self._prep_xmltext(xml, 'Password')
-        self.sftp_settings['key_filepath'] = self._prep_xmltext(xml, 'KeyfilePath')
+        self.sftp_settings['hostname'] = settings.get('Hostname')
+        self.sftp_settings['port'] = int(settings.get('Port'))
+        self.sftp_settings['username'] = settings.get('Username')
+        self.sftp_settings['password'] = settings.get('Password')
+        self.sftp_settings['key_filepath'] = settings.get('KeyfilePath')
         if self.sftp_settings['key_filepath']:
-            self.sftp_settings['key_passphrase'] = self._prep_xmltext(xml, 'KeyfilePassphrase')
+            self.sftp_settings['key_passphrase'] = settings.get('KeyfilePassphrase')
         else:
             self.sftp_settings['key_passphrase'] = None
-        self.sftp_settings['remote_path'] = self._prep_xmltext(xml, 'RemotePath')
+        self.sftp_settings['remote_path'] = settings.get('RemotePath')
         # Add trailing slash
-        if self.sftp_settings['remote_path']:
-            if self.sftp_settings['remote_path'][len(self.sftp_settings['remote_path'])-1] != '/':
-                self.sftp_settings['remote_path'] += '/'
-        self.sftp_settings['move_path'] = self._prep_xmltext(xml, 'MovePath')
+        if self.sftp_settings['remote_path'] and not self.sftp_settings['remote_path'].endswith('/'):
+            self.sftp_settings['remote_path'] += '/'
+        self.sftp_settings['move_path'] = settings.get('MovePath')
         # Tool Mode
         self.tool_mode = {
             'list': self.ToolMode.LIST_FILES,
             'download_file': self.ToolMode.DOWNLOAD_TO_PATH,
             'download_blob': self.ToolMode.DOWNLOAD_TO_BLOB
-        }.get(self._prep_xmltext(xml, 'ToolMode'), self.ToolMode.NONE_MODE)
+        }.get(settings.get('ToolMode'), self.ToolMode.NONE_MODE)
         # File Handling
         self.file_handling = {
             'keep_files': self.FileHandling.KEEP_FILES,
             'delete_files': self.FileHandling.DELETE_FILES,
             'move_files': self.FileHandling.MOVE_FILES
-        }.get(self._prep_xmltext(xml, 'FileHandling'), self.FileHandling.NONE_HANDLING)
+        }.get(settings.get('FileHandling'), self.FileHandling.NONE_HANDLING)
+        # Checked for every file, plain attributes are cheaper than comparing enum members
+        self._is_list = (self.tool_mode == self.ToolMode.LIST_FILES)
+        self._is_blob = (self.tool_mode == self.ToolMode.DOWNLOAD_TO_BLOB)
+        self._is_path = (self.tool_mode == self.ToolMode.DOWNLOAD_TO_PATH)
+        self._delete_files = (self.file_handling == self.FileHandling.DELETE_FILES)
+        self._move_files = (self.file_handling == self.FileHandling.MOVE_FILES)
         # Output Settings
         if self.tool_mode == self.ToolMode.DOWNLOAD_TO_PATH:
-            self.output_settings['local_path'] = self._prep_xmltext(xml, 'LocalPath')
+            self.output_settings['local_path'] = settings.get('LocalPath')
             self.output_settings['local_path'] = os.path.join(self.output_settings['local_path'], "")
         else:
             self.output_settings['local_path'] = None
+        # Number of parallel downloads, capped at MAX_CONCURRENCY
+        if settings.get('Concurrency'):
+            self.concurrency = min(max(int(settings.get('Concurrency')), 1), MAX_CONCURRENCY)
+        else:
+            self.concurrency = DEFAULT_CONCURRENCY
         # Incoming Settings
-        self.incoming_field = self._prep_xmltext(xml, 'IncomingField')
+        self.incoming_field = settings.get('IncomingField')
 
         # Validate settings
         self.validate_settings()
@@ -397,48 +837,98 @@ class AyxPlugin:
 
         # Collect all files and directories
         # We need it for any tool mode, so we collect it once
-        file_list = list()
-        sftp_files = sftp_conn.listdir_attr()
-        for fattr in sftp_files:
-            file_list.append({
-                'filename': str(fattr.filename),
-                'size': int(fattr.st_size),
-                'uid': str(fattr.st_uid),
-                'gid': str(fattr.st_gid),
-                'mode': str(pysftp.st_mode_to_int(fattr.st_mode)),
-                'atime': datetime.utcfromtimestamp(int(fattr.st_atime)).strftime("%Y-%m-%d %H:%M:%S"),
-                'mtime': datetime.utcfromtimestamp(int(fattr.st_mtime)).strftime("%Y-%m-%d %H:%M:%S"),
-                'is_file': sftp_conn.isfile(fattr.filename),
-                'is_dir': sftp_conn.isdir(fattr.filename)
-            })
+        sftp_files = self._sftp.listdir_attr('.')
+        for idx, fattr in enumerate(sftp_files):
+            # File type is part of the attributes already, only symlinks need to be resolved on the server
+            if stat.S_ISLNK(fattr.st_mode):
+                try:
+                    target_attr = self._sftp.stat(fattr.filename)
+                except IOError:
+                    # Broken link, neither file nor directory
+                    continue
+                if self._is_list:
+                    # The file list shows the attributes of the link itself, only the file type is the one of its target
+                    fattr.st_mode = stat.S_IMODE(fattr.st_mode) | stat.S_IFMT(target_attr.st_mode)
+                else:
+                    target_attr.filename = fattr.filename
+                    sftp_files[idx] = target_attr
         
         # Get everything Alteryx needs
         self.output_recordinfo, record_creator, field_dict = self.build_ayx_output(push_metadata=True)
 
-        # Iterate through all files in current directory
-        item_counter = -1
-        for f in file_list:
-            # Update progress
-            item_counter += 1
-            self.output_anchor.update_progress(item_counter / float(len(file_list)))
-
-            if not f['is_file'] and self.tool_mode != self.ToolMode.LIST_FILES:
-                # If not a file, do not download
-                self.output_message('"{}{}" is not a file. Skipped.'.format(self.sftp_settings['remote_path'], f['filename']),
+        item_counter = 0
+        download_counter = 0
+        # Report progress at most ~100 times, every update is a call into the engine
+        progress_step = max(1, len(sftp_files) // 100)
+        if self._is_list:
+            # Iterate through all files in current directory
+            for fattr in sftp_files:
+                # Update progress
+                if item_counter % progress_step == 0:
+                    self.output_anchor.update_progress(item_counter / float(len(sftp_files)))
+                item_counter += 1
+
+                # Output file attributes
+                self._emit_record(fattr, None, field_dict, record_creator)
+        else:
+            skip_counter = 0
+            for fattr in sftp_files:
+                if not stat.S_ISREG(fattr.st_mode):
+                    # If not a file, do not download
+                    skip_counter += 1
+                    if skip_counter <= MAX_SKIP_MESSAGES:
+                        self.output_message('"{}{}" is not a file. Skipped.'.format(self.sftp_settings['remote_path'], fattr.filename),
+                                            messageType=Sdk.EngineMessageType.warning)
+            if skip_counter > MAX_SKIP_MESSAGES:
+                self.output_message('... and {} more items in {} which are not files. Skipped.'.format(skip_counter - MAX_SKIP_MESSAGES, self.sftp_settings['remote_path']),
                                     messageType=Sdk.EngineMessageType.warning)
-                continue
-
-            # Process file
-            self._process_file(sftp_conn, f, field_dict, self.output_recordinfo, record_creator)
 
-        # Close connection
-        sftp_conn.close()
+            # Download files in parallel, each worker thread borrows a connection from the pool.
+            # Records are pushed from this thread only, as the Alteryx SDK is not thread-safe.
+            self._start_file_handling(sftp_conn.get_channel().get_transport())
+            download_files = [fattr for fattr in sftp_files if stat.S_ISREG(fattr.st_mode)]
+            # Progress is measured in files only, skipped items are not waited for
+            progress_step = max(1, len(download_files) // 100)
+            to_download = iter(download_files)
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                # Only a few downloads are in flight at a time, so finished ones do not pile up in memory
+                for fattr in to_download:
+                    pending.append((fattr, executor.submit(self._download_worker, fattr)))
+                    if len(pending) >= 2 * self.concurrency:
+                        break
+                while pending:
+                    fattr, future = pending.popleft()
+                    next_fattr = next(to_download, None)
+                    if next_fattr is not None:
+                        pending.append((next_fattr, executor.submit(self._download_worker, next_fattr)))
+
+                    # Update progress
+                    if item_counter % progress_step == 0:
+                        self.output_anchor.update_progress(item_counter / float(len(download_files)))
+                    item_counter += 1
+
+                    try:
+                        payload = future.result()
+                    except TRANSFER_ERRORS as e:
+                        self.output_message('Error transferring file "{}": {}'.format(fattr.filename, e))
+                        continue
+
+                    self._emit_record(fattr, payload, field_dict, record_creator)
+                    download_counter += 1
+                    # Moving/deleting the file must not hold up pushing the next record
+                    self._queue_file_handling(fattr)
+            self._finish_file_handling()
+
+        # Close connections
+        self.pool.close_all()
+        _close_connection(sftp_conn)
 
         # Log Tool input
-        if self.tool_mode == self.ToolMode.LIST_FILES:
-            inp_msg = "{} items in found in directory {}{}".format(len(file_list), self.sftp_settings['hostname'], self.sftp_settings['remote_path'])
+        if self._is_list:
+            inp_msg = "{} items in found in directory {}{}".format(len(sftp_files), self.sftp_settings['hostname'], self.sftp_settings['remote_path'])
         else:
-            inp_msg = "{} files downloaded from {}{}".format(len([1 for f in file_list if f['is_file']]), self.sftp_settings['hostname'], self.sftp_settings['remote_path'])
+            inp_msg = "{} files downloaded from {}{}".format(download_counter, self.sftp_settings['hostname'], self.sftp_settings['remote_path'])
         self.output_message(inp_msg, messageType=Sdk.Status.info)
 
         self.output_anchor.update_progress(1)
@@ -461,59 +951,113 @@ class AyxPlugin:
         """
         self.alteryx_engine.output_message(self.n_tool_id, messageType, self.xmsg(text))
     
-    def _process_file(self, sftp_conn: pysftp.Connection, f: dict, field_dict: dict, record_info: object, record_creator: object):
-        """Process single remote file.
+    def _download_file(self, sftp_client: object, fattr: object) -> object:
+        """Downloads a single remote file.
+
+        Does not call into the Alteryx engine, so it can run in a worker thread as long as every
+        thread uses its own SFTP channel.
+        :param sftp_client: SFTP channel, working directory set to remote path
+        :type sftp_client: paramiko.SFTPClient
+        :param fattr: Attributes of the remote file
+        :type fattr: paramiko.SFTPAttributes
+        :raises IOError: If the file could not be transferred
+        :return: File contents for DOWNLOAD_TO_BLOB, local file path otherwise
+        :rtype: bytes or str
+        """
+        with sftp_client.open(fattr.filename, 'rb') as remote_f:
+            # Request all blocks of the file up front, so the transfer is not paced by round trips.
+            # getfo() does the same, but asks the server for the file size first.
+            remote_f.prefetch(fattr.st_size)
+
+            if self._is_blob:
+                # Stream file contents straight into memory for the blob. The buffer is sized from the
+                # listed file size, so it does not have to grow (and copy) while downloading.
+                blob_buffer = io.BytesIO(bytes(fattr.st_size))
+                shutil.copyfileobj(remote_f, blob_buffer, LOCAL_BUFFER_SIZE)
+                blob_buffer.truncate()
+                return blob_buffer.getvalue()
+
+            # Build local path for download
+            out_fname = os.path.join(self.output_settings['local_path'], fattr.filename)
+            with open(out_fname, 'wb', buffering=LOCAL_BUFFER_SIZE) as out_f:
+                shutil.copyfileobj(remote_f, out_f, LOCAL_BUFFER_SIZE)
+        return out_fname
+
+    def _download_worker(self, fattr: object) -> object:
+        """Downloads a single remote file using a connection from the pool.
         
-        :param sftp_conn: [description]
-        :type sftp_conn: pysftp.Connection
-        :param f: [description]
-        :type f: dict
-        :param field_dict: [description]
+        :param fattr: Attributes of the remote file
+        :type fattr: paramiko.SFTPAttributes
+        :return: File contents for DOWNLOAD_TO_BLOB, local file path otherwise
+        :rtype: bytes or str
+        """
+        with self.pool.acquire() as conn:
+            return self._download_file(conn, fattr)
+
+    def _fetch_worker(self, filename: str, fattr: object = None) -> tuple:
+        """Looks up and downloads a single remote file requested by an incoming record.
+
+        Runs in a worker thread using a connection from the pool.
+        :param filename: Name of the file relative to the remote path
+        :type filename: str
+        :param fattr: Attributes of the remote file if listed already, otherwise (or if it is gone by now) they are requested from the server
+        :type fattr: paramiko.SFTPAttributes
+        :return: Attributes of the remote file (None if it does not exist), result of _download_file (None if it is not a file)
+        :rtype: tuple
+        """
+        with self.pool.acquire() as conn:
+            if fattr is not None and stat.S_ISREG(fattr.st_mode):
+                # Listed when the first record came in, the file may have been moved or deleted since
+                try:
+                    return fattr, self._download_file(conn, fattr)
+                except IOError as e:
+                    if e.errno != errno.ENOENT:
+                        raise
+                fattr = None
+            if fattr is None:
+                try:
+                    fattr = conn.stat(filename)
+                except IOError:
+                    return None, None
+            if not stat.S_ISREG(fattr.st_mode):
+                return fattr, None
+            # Attributes from stat() do not carry the filename
+            fattr.filename = filename
+            return fattr, self._download_file(conn, fattr)
+
+    def _emit_record(self, fattr: object, payload: object, field_dict: dict, record_creator: object):
+        """Builds the output record for a single remote file and pushes it downstream.
+
+        Must only be called from the thread the Alteryx engine called us on.
+        :param fattr: Attributes of the remote file
+        :type fattr: paramiko.SFTPAttributes
+        :param payload: Result of _download_file, None for LIST_FILES
+        :type payload: bytes or str
+        :param field_dict: Output fields by name
         :type field_dict: dict
-        :param record_creator: [description]
+        :param record_creator: RecordCreator for the output
         :type record_creator: object
         """
         # These fields are shared by all tool modes (directories only for LIST_FILES)
-        record_info[field_dict['Filename']].set_from_string(record_creator, f['filename'])
-        record_info[field_dict['Size']].set_from_int32(record_creator, f['size'])
-        record_info[field_dict['TimeAdded']].set_from_string(record_creator, f['atime'])
-        record_info[field_dict['TimeModified']].set_from_string(record_creator, f['mtime'])
+        field_dict['Filename'].set_from_string(record_creator, fattr.filename)
+        field_dict['Size'].set_from_int32(record_creator, int(fattr.st_size))
+        field_dict['TimeAdded'].set_from_string(record_creator, _format_timestamp(fattr.st_atime))
+        field_dict['TimeModified'].set_from_string(record_creator, _format_timestamp(fattr.st_mtime))
 
-        if self.tool_mode == self.ToolMode.LIST_FILES:
+        if self._is_list:
             # Fields only present for LIST_FILES mode
-            record_info[field_dict['UID']].set_from_string(record_creator, f['uid'])
-            record_info[field_dict['GID']].set_from_string(record_creator, f['gid'])
-            record_info[field_dict['Mode']].set_from_string(record_creator, f['mode'])
-            record_info[field_dict['IsDirectory']].set_from_bool(record_creator, f['is_dir'])
-            record_info[field_dict['IsFile']].set_from_bool(record_creator, f['is_file'])
-        elif self.tool_mode != self.ToolMode.LIST_FILES:
-            # Download files if not in LIST_FILES mode
-            if self.tool_mode == self.ToolMode.DOWNLOAD_TO_BLOB:
-                # Generate temporary filename
-                out_fname = self.alteryx_engine.create_temp_file_name('tmp')
-            elif self.tool_mode == self.ToolMode.DOWNLOAD_TO_PATH:
-                # Build local path for download
-                out_fname = os.path.join(self.output_settings['local_path'], f['filename'])
-            
-            # Download file
-            try:
-                # Download file to temporary folder
-                sftp_conn.get(f['filename'], localpath=out_fname)
-            except IOError as e:
-                self.output_message('Error transferring file "{}": {}'.format(f['filename'], e))
-
-            # Generate BLOB for Alteryx
-            if self.tool_mode == self.ToolMode.DOWNLOAD_TO_BLOB:
-                # Read file as binary for blob
-                with open(out_fname, 'rb') as temp_f:
-                    blob_content = temp_f.read()
-            
-            if self.tool_mode == self.ToolMode.DOWNLOAD_TO_BLOB:
-                # Add file as blob
-                record_info[field_dict[self.output_settings['blobfield']]].set_from_blob(record_creator, blob_content)
-            elif self.tool_mode == self.ToolMode.DOWNLOAD_TO_PATH:
-                # Add file path
-                record_info[field_dict['FilePath']].set_from_string(record_creator, out_fname)
+            field_dict['UID'].set_from_string(record_creator, str(fattr.st_uid))
+            field_dict['GID'].set_from_string(record_creator, str(fattr.st_gid))
+            # Permission bits as octal digits, e.g. 644
+            field_dict['Mode'].set_from_string(record_creator, oct(fattr.st_mode & 0o777)[2:])
+            field_dict['IsDirectory'].set_from_bool(record_creator, stat.S_ISDIR(fattr.st_mode))
+            field_dict['IsFile'].set_from_bool(record_creator, stat.S_ISREG(fattr.st_mode))
+        elif self._is_blob:
+            # Add file as blob
+            field_dict[self.output_settings['blobfield']].set_from_blob(record_creator, payload)
+        elif self._is_path:
+            # Add file path
+            field_dict['FilePath'].set_from_string(record_creator, payload)
 
         # Finalize record for this file and push
         out_record = record_creator.finalize_record()
@@ -521,52 +1065,43 @@ class AyxPlugin:
         # Reset for next file
         record_creator.reset()
 
-        # Handle file after it has been downloaded
-        if self.file_handling == self.FileHandling.MOVE_FILES:
-            # Check if target folder exists
-            if not sftp_conn.exists(self.sftp_settings['move_path']):
-                self.output_message("The target folder {} does not exist.".format(self.sftp_settings['move_path']),
-                                    messageType=Sdk.EngineMessageType.warning)
-                return
-
-            # Check if it is actually a folder
-            if not sftp_conn.isdir(self.sftp_settings['move_path']):
-                self.output_message("The target folder {} is not a directory.".format(self.sftp_settings['move_path']),
-                                    messageType=Sdk.EngineMessageType.warning)
-                return
-
+    def _handle_file(self, sftp_client: object, fattr: object) -> tuple:
+        """Moves or deletes a remote file after it has been downloaded.
+
+        Does not call into the Alteryx engine, so it can run in a worker thread. Errors are
+        returned as a message to be shown by the caller instead.
+        :param sftp_client: SFTP channel
+        :type sftp_client: paramiko.SFTPClient
+        :param fattr: Attributes of the remote file
+        :type fattr: paramiko.SFTPAttributes
+        :return: Error message text and message type, None on success
+        :rtype: tuple
+        """
+        if self._move_files:
             # Try to move file
             try:
-                sftp_conn.rename(sftp_conn.pwd + "/" + f['filename'],
-                                 sftp_conn.normalize(self.sftp_settings['move_path']) + "/" + f['filename'])
-            except IOError as e:
-                self.output_message('Error moving file "{}": {}'.format(f['filename'], e))
-            else:
-                self.output_message('File {} moved to {}.'.format(f['filename'], sftp_conn.normalize(self.sftp_settings['move_path'])),
-                                    messageType=Sdk.EngineMessageType.info)
-        elif self.file_handling == self.FileHandling.DELETE_FILES:
+                sftp_client.rename(self._remote_cwd + "/" + fattr.filename,
+                                   self._move_target + "/" + fattr.filename)
+            except (IOError, paramiko.SSHException) as e:
+                return 'Error moving file "{}": {}'.format(fattr.filename, e), Sdk.EngineMessageType.error
+        elif self._delete_files:
             # Simply delete file
             try:
-                sftp_conn.remove(sftp_conn.pwd + "/" + f['filename'])
-            except IOError as e:
-                self.output_message('Error deleting file "{}": {}'.format(f['filename'], e))
-            else:
-                self.output_message('File {} deleted from server.'.format(f['filename']),
-                                    messageType=Sdk.EngineMessageType.info)
-            
+                sftp_client.remove(self._remote_cwd + "/" + fattr.filename)
+            except (IOError, paramiko.SSHException) as e:
+                return 'Error deleting file "{}": {}'.format(fattr.filename, e), Sdk.EngineMessageType.error
+        return None
+
     @staticmethod
-    def _prep_xmltext(et: Et, key: str) -> str:
-        """Wrapper to quickly get settings.
+    def _parse_xml_settings(et: Et) -> dict:
+        """Reads all settings from the GUI at once.
         
         :param et: Element Tree from parsed Xml
         :type et: xml.etree.ElementTree
-        :param key: Name of the setting
-        :type key: str
-        :return: Parsed value for setting
-        :rtype: str
+        :return: Stripped value for each setting, None if empty
+        :rtype: dict
         """
-        t = et.find(key).text.strip() if et.findtext(key) and (et.find(key).text is not None) else None
-        return None if not t or t == "" else t
+        return {child.tag: (child.text.strip() if child.text else None) or None for child in et}
     
     @staticmethod
     def xmsg(msg_string: str) -> str:
@@ -603,8 +1138,14 @@ class IncomingInterface:
         self.field_dict = dict()
         # SFTP Connection reference
         self.sftp_conn = None
+        # Downloads run in a thread pool, pending ones are completed in the order of the incoming records
+        self.executor = None
+        self.pending = deque()
+        # Attributes of the files in the remote path by name, listed once instead of a stat() per record
+        self.remote_stat_cache = dict()
 
         self.file_counter = 0
+        self.update_only = False
 
     def ii_init(self, record_info_in: object) -> bool:
         """
@@ -626,6 +1167,8 @@ class IncomingInterface:
         self.ayx_plugin.output_recordinfo = self.record_info_out
 
         self.file_counter = 0
+        # Does not change during a run, so it is not asked for every record
+        self.update_only = (self.ayx_plugin.alteryx_engine.get_init_var(self.ayx_plugin.n_tool_id, 'UpdateOnly') == 'True')
 
         return True
 
@@ -635,60 +1178,75 @@ class IncomingInterface:
         :param in_record: The data for the incoming record.
         :return: False if method calling limit is hit.
         """
-        if (in_record is None) or (self.ayx_plugin.alteryx_engine.get_init_var(self.ayx_plugin.n_tool_id, 'UpdateOnly') == 'True'):
+        if (in_record is None) or self.update_only:
             return False
+        plugin = self.ayx_plugin
 
         # Validate settings
-        if not self.ayx_plugin.validate_settings(silent=False):
+        if not plugin.validate_settings(silent=False):
             return False
         if not self.in_field:
             return False
 
-        if self.ayx_plugin.tool_mode == self.ayx_plugin.ToolMode.LIST_FILES:
-            self.ayx_plugin.output_message('"List Files" is not supported when filenames are provided through an incoming connection.')
+        if plugin._is_list:
+            plugin.output_message('"List Files" is not supported when filenames are provided through an incoming connection.')
             return False
 
         # If we do not yet have a connection, we need to connect
         if not self.sftp_conn:
-            self.sftp_conn = self.ayx_plugin._init_sftp()
+            self.sftp_conn = plugin._init_sftp()
             if not self.sftp_conn:
                 return False
+            plugin._start_file_handling(self.sftp_conn.get_channel().get_transport())
+            self.executor = ThreadPoolExecutor(max_workers=plugin.concurrency)
+            try:
+                self.remote_stat_cache = {fattr.filename: fattr for fattr in plugin._sftp.listdir_attr('.')}
+            except IOError:
+                self.remote_stat_cache = dict()
 
-        # Current file
+        # Current file, downloaded in the background
         cur_fname = self.in_field.get_as_string(in_record)
-        # Check whether file exists
-        if not self.sftp_conn.exists(cur_fname):
+        fattr = self.remote_stat_cache.get(cur_fname)
+        if fattr is not None and stat.S_ISLNK(fattr.st_mode):
+            # Links are resolved by the server
+            fattr = None
+        self.pending.append((cur_fname, self.executor.submit(plugin._fetch_worker, cur_fname, fattr)))
+
+        # Do not let finished downloads pile up in memory
+        if len(self.pending) > 2 * plugin.concurrency:
+            self._complete_oldest()
+
+        return True
+
+    def _complete_oldest(self):
+        """Waits for the oldest pending download and pushes its record downstream.
+
+        Called from the thread the Alteryx engine called us on only, as the SDK is not thread-safe.
+        """
+        cur_fname, future = self.pending.popleft()
+        try:
+            fattr, payload = future.result()
+        except TRANSFER_ERRORS as e:
+            self.ayx_plugin.output_message('Error transferring file "{}": {}'.format(cur_fname, e))
+            return
+
+        if fattr is None:
             self.ayx_plugin.output_message('File "{}{}" does not exist. Skipped.'.format(self.ayx_plugin.sftp_settings['remote_path'], cur_fname),
                                            messageType=Sdk.EngineMessageType.warning)
-            return True
-
+            return
         # Check if it is actually a file
-        if not self.sftp_conn.isfile(cur_fname):
+        if payload is None:
             self.ayx_plugin.output_message('File "{}{}" is actually a folder. Skipped.'.format(self.ayx_plugin.sftp_settings['remote_path'], cur_fname),
                                            messageType=Sdk.EngineMessageType.warning)
-            return True
-    
-        # Get details on the file
-        fattr = self.sftp_conn.stat(cur_fname)
-        cur_f = {
-            'filename': str(cur_fname),
-            'size': int(fattr.st_size),
-            'uid': str(fattr.st_uid),
-            'gid': str(fattr.st_gid),
-            'mode': str(pysftp.st_mode_to_int(fattr.st_mode)),
-            'atime': datetime.utcfromtimestamp(int(fattr.st_atime)).strftime("%Y-%m-%d %H:%M:%S"),
-            'mtime': datetime.utcfromtimestamp(int(fattr.st_mtime)).strftime("%Y-%m-%d %H:%M:%S")
-        }
-
-        # Process file
-        self.ayx_plugin._process_file(self.sftp_conn, cur_f, self.field_dict, self.record_info_out, self.record_creator)
+            return
+
+        self.ayx_plugin._emit_record(fattr, payload, self.field_dict, self.record_creator)
+        self.ayx_plugin._queue_file_handling(fattr)
 
         # Update Record Counts downstream
         self.ayx_plugin.output_anchor.output_record_count(False)
         self.file_counter += 1
 
-        return True
-
     def ii_update_progress(self, d_percent: float):
         """
         Called by the upstream tool to report what percentage of records have been pushed.
@@ -702,7 +1260,14 @@ class IncomingInterface:
         Called when the incoming connection has finished passing all of its records.
         """
         if self.sftp_conn:
-            self.sftp_conn.close()
+            # Wait for the remaining downloads
+            while self.pending:
+                self._complete_oldest()
+            self.executor.shutdown()
+            self.executor = None
+            self.ayx_plugin._finish_file_handling()
+            self.ayx_plugin.pool.close_all()
+            _close_connection(self.sftp_conn)
             self.sftp_conn = None
 
         if self.ayx_plugin.tool_mode == self.ayx_plugin.ToolMode.LIST_FILES:
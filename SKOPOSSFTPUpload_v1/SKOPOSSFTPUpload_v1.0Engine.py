@@ -6,14 +6,276 @@ Although defining IncomingInterface is optional, the interface methods are neede
 import re
 import io
 import os
+import errno
+import shutil
+import stat
 import AlteryxPythonSDK as Sdk
 import xml.etree.ElementTree as Et
-import pysftp
+import paramiko
 import base64
-from datetime import datetime
+import queue
+import socket
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 REGEX_HOSTNAME = r"^(([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9])\.)*([A-Za-z0-9]|[A-Za-z0-9][A-Za-z0-9\-]*[A-Za-z0-9])$"
+HOSTNAME_RE = re.compile(REGEX_HOSTNAME)
+# Number of parallel SFTP connections used for uploading, unless set in the GUI
+DEFAULT_CONCURRENCY = 8
+# OpenSSH starts dropping connections once 10 are authenticating at the same time (MaxStartups),
+# which happens when all workers connect at once
+MAX_CONCURRENCY = 8
+# Errors of a transfer in a worker thread, including opening its connection
+TRANSFER_ERRORS = (IOError, paramiko.SSHException)
+# Host keys of known servers, as used by OpenSSH
+KNOWN_HOSTS_FILE = os.path.join(os.path.expanduser('~'), '.ssh', 'known_hosts')
+# Private key types tried for a key file, in this order
+PRIVATE_KEY_CLASSES = (paramiko.RSAKey, paramiko.ECDSAKey, paramiko.Ed25519Key, paramiko.DSSKey)
+# Chunk size for copying local data to the server. paramiko splits it into SFTP write requests
+# anyway, Python's default of 8 KiB only means more reads and method calls.
+LOCAL_BUFFER_SIZE = 1 << 20
+# Socket buffers for bulk transfers, large enough for the bandwidth-delay product of WAN links
+SOCKET_BUFFER_SIZE = 1 << 22
+# Seconds between keepalive packets, so idle connections are not dropped by NAT gateways and firewalls
+KEEPALIVE_INTERVAL = 30
+# Successfully processed files are reported in batches of this size instead of one message each
+MESSAGE_BATCH_SIZE = 100
+
+def _stat_or_none(path: str) -> os.stat_result:
+    """Stats a local path, so existence and type can be checked with a single system call.
+
+    :param path: Local path
+    :type path: str
+    :return: Result of os.stat, None if the path does not exist
+    :rtype: os.stat_result
+    """
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _move_local_file(src: str, dst: str):
+    """Moves a local file, also to another file system or drive.
+
+    :param src: Path of the file
+    :type src: str
+    :param dst: New path of the file
+    :type dst: str
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Cannot be renamed across file systems, copy and delete instead
+        shutil.move(src, dst)
+
+
+# Parsed known_hosts, shared by all connections of the process, and the modification time it was read at
+_host_keys = None
+_host_keys_mtime = None
+_host_keys_lock = threading.Lock()
+
+
+def _load_host_keys() -> paramiko.HostKeys:
+    """Reads the host keys of known servers.
+
+    known_hosts is only parsed again if it has changed since, every connection would read it otherwise.
+    :return: Host keys from known_hosts, empty if the file does not exist
+    :rtype: paramiko.HostKeys
+    """
+    global _host_keys, _host_keys_mtime
+    hosts_stat = _stat_or_none(KNOWN_HOSTS_FILE)
+    mtime = hosts_stat.st_mtime_ns if hosts_stat is not None else None
+    with _host_keys_lock:
+        if _host_keys is None or mtime != _host_keys_mtime:
+            _host_keys = paramiko.HostKeys()
+            try:
+                _host_keys.load(KNOWN_HOSTS_FILE)
+            except IOError:
+                pass
+            _host_keys_mtime = mtime
+        return _host_keys
+
+
+def _load_private_key(key_filepath: str = None, passphrase: str = None) -> paramiko.PKey:
+    """Reads a private key in OpenSSH format.
+
+    Without a key file, the default key of OpenSSH is used if there is one.
+    :param key_filepath: Path of the key file
+    :type key_filepath: str
+    :param passphrase: Passphrase of the key file, if encrypted
+    :type passphrase: str
+    :raises paramiko.AuthenticationException: If there is no key file
+    :raises paramiko.SSHException: If the key file could not be read
+    :return: Private key
+    :rtype: paramiko.PKey
+    """
+    if not key_filepath:
+        for default_key in ('id_rsa', 'id_dsa'):
+            default_path = os.path.join(os.path.expanduser('~'), '.ssh', default_key)
+            if os.path.exists(default_path):
+                key_filepath = default_path
+                break
+        else:
+            raise paramiko.AuthenticationException("No password or key specified.")
+
+    # The key type is not known beforehand, each class refuses keys of other types
+    for key_class in PRIVATE_KEY_CLASSES:
+        try:
+            return key_class.from_private_key_file(key_filepath, passphrase)
+        except paramiko.PasswordRequiredException:
+            raise
+        except paramiko.SSHException:
+            continue
+    raise paramiko.SSHException("Key file {} could not be read. Please check key type and passphrase.".format(key_filepath))
+
+
+def _open_socket(hostname: str, port: int) -> socket.socket:
+    """Connects a TCP socket to the server, set up for bulk transfers.
+
+    :param hostname: Hostname of the server
+    :type hostname: str
+    :param port: Port of the server
+    :type port: int
+    :raises OSError: If no address of the server could be connected
+    :return: Connected socket
+    :rtype: socket.socket
+    """
+    last_error = socket.gaierror("No address found for {}".format(hostname))
+    for family, socktype, proto, _, address in socket.getaddrinfo(hostname, port, 0, socket.SOCK_STREAM):
+        sock = socket.socket(family, socktype, proto)
+        try:
+            # Buffer sizes have to be set before connecting, as the TCP window scale is negotiated then
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            # SSH sends complete packets, do not hold back small ones (Nagle's algorithm)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            last_error = e
+            sock.close()
+    raise last_error
+
+
+def _close_connection(sftp_client: paramiko.SFTPClient):
+    """Closes an SFTP client together with the SSH connection it runs on.
+
+    :param sftp_client: SFTP client from AyxPlugin._make_connection()
+    :type sftp_client: paramiko.SFTPClient
+    """
+    transport = sftp_client.get_channel().get_transport()
+    sftp_client.close()
+    transport.close()
+
+
+class SFTPConnectionPool:
+    """
+    Keeps up to a fixed number of SFTP connections, which are opened on demand and reused afterwards.
+    Each connection is only used by one thread at a time, as paramiko's SFTPClient is not thread-safe.
+    """
+
+    def __init__(self, factory: object, size: int, connections: list = ()):
+        """
+        Constructor for SFTPConnectionPool.
+        :param factory: Callable opening a new connection, must not call into the Alteryx engine
+        :param size: Maximum number of connections
+        :param connections: Connections opened already, owned by the pool from now on
+        """
+        self._factory = factory
+        # Free slots are None until a connection is needed. LIFO, so idle connections are reused
+        # before opening another one.
+        self._idle = queue.LifoQueue(maxsize=size)
+        for _ in range(size - len(connections)):
+            self._idle.put(None)
+        for conn in connections:
+            self._idle.put(conn)
+        self._connections = list(connections)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """Borrows a connection, waiting if all of them are in use.
+
+        :return: Context manager yielding a paramiko.SFTPClient, released when leaving the context
+        """
+        conn = self._idle.get()
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                self._idle.put(None)
+                raise
+            with self._lock:
+                self._connections.append(conn)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def release(self, conn: paramiko.SFTPClient):
+        """Returns a connection to the pool. Broken connections are closed and replaced on demand.
+
+        :param conn: Connection taken from acquire()
+        :type conn: paramiko.SFTPClient
+        """
+        if conn.get_channel().get_transport().is_active():
+            self._idle.put(conn)
+            return
+        with self._lock:
+            self._connections.remove(conn)
+        _close_connection(conn)
+        self._idle.put(None)
+
+    def close_all(self):
+        """Closes all connections. The pool must not be in use anymore."""
+        with self._lock:
+            for conn in self._connections:
+                _close_connection(conn)
+            self._connections = list()
+
+
+class MessageAggregator:
+    """
+    Collects the names of successfully processed files and reports them in batches, as every message
+    is a call into the Alteryx engine. Must only be used from the thread the engine called us on.
+    """
+
+    def __init__(self, plugin: object, prefix: str, batch_size: int = MESSAGE_BATCH_SIZE):
+        """
+        Constructor for MessageAggregator.
+        :param plugin: AyxPlugin showing the messages
+        :param prefix: Start of each message, followed by the file names
+        :param batch_size: Number of file names per message
+        """
+        self._plugin = plugin
+        self._prefix = prefix
+        self._batch_size = batch_size
+        self._names = list()
+        self.total = 0
+
+    def add(self, name: str):
+        """Adds a file, the message is shown once the batch is full.
+
+        :param name: Name of the file
+        :type name: str
+        """
+        self._names.append(name)
+        self.total += 1
+        if len(self._names) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Shows a message for the files collected so far."""
+        if self._names:
+            self._plugin.output_message('{} {}'.format(self._prefix, ', '.join(self._names)), messageType=Sdk.Status.info)
+            self._names = list()
+
 
 class AyxPlugin:
     """
@@ -58,29 +320,50 @@ class AyxPlugin:
         # Tool mode: What should we do?
         self.upload_mode = self.UploadMode.NONE_MODE
         self.file_handling = self.FileHandling.NONE_HANDLING
+        # Modes as plain flags for the per-file code paths
+        self._upload_files = False
+        self._upload_blobs = False
+        self._delete_files = False
+        self._move_files = False
         self.move_path = None
         self.incoming_field = None
         self.blob_field = None
         self.overwrite = False
+        # Number of files transferred in parallel
+        self.concurrency = DEFAULT_CONCURRENCY
 
         # Storage
         self.input_anchor = None
         self.input_recordinfo = None
+        # Settings and result of the last validation
+        self._settings_validated = None
+
+        # Parallel uploads: connections used by the worker threads
+        self._remote_cwd = None
+        self.pool = None
 
     def validate_settings(self, silent=False) -> bool:
         """Validate settings
         Checks whether the settings made in the GUI are valid and provides error messages otherwise.
         
+        Settings do not change while records are processed, so the result is reused as long as
+        they are the same. A failed validation is repeated if its messages are to be shown.
         :return: Status of validation
         :rtype: bool
         """
+        settings_key = (tuple(sorted(self.sftp_settings.items())), self.upload_mode, self.file_handling,
+                        self.move_path, self.incoming_field, self.blob_field)
+        if self._settings_validated is not None and self._settings_validated[0] == settings_key:
+            if silent or self._settings_validated[1]:
+                return self._settings_validated[1]
+
         validation_result = True
         # Validate the settings
         if not self.sftp_settings['hostname']:
             if not silent:
                 self.output_message('Please enter a hostname.')
             validation_result = False
-        elif not re.match(REGEX_HOSTNAME, self.sftp_settings['hostname']):
+        elif not HOSTNAME_RE.match(self.sftp_settings['hostname']):
             if not silent:
                 self.output_message('Please enter a valid hostname without protocol, user or port.')
             validation_result = False
@@ -149,52 +432,81 @@ class AyxPlugin:
                     self.output_message('The target path for moving the files is not a directory. Please enter a directory.')
                 validation_result = False
 
+        self._settings_validated = (settings_key, validation_result)
         return validation_result
 
-    def _init_sftp(self) -> pysftp.Connection:
+    def _make_connection(self, cwd: str = None) -> paramiko.SFTPClient:
+        """Opens a new connection to the SFTP server.
+
+        Does not call into the Alteryx engine, so it can be used from worker threads. The host key
+        of an unknown host is accepted and cached to known_hosts.
+        :param cwd: Remote working directory to change to, if any
+        :type cwd: str
+        :return: SFTP client on its own SSH connection
+        :rtype: paramiko.SFTPClient
+        """
+        hostname = self.sftp_settings['hostname']
+        # SFTP Security: Check for known_hosts
+        host_keys = _load_host_keys()
+        known_keys = host_keys.lookup(hostname)
+
+        transport = paramiko.Transport(_open_socket(hostname, self.sftp_settings['port']))
+        try:
+            transport.set_keepalive(KEEPALIVE_INTERVAL)
+            transport.use_compression(False)
+            # A password takes precedence over the key file
+            pkey = None
+            if self.sftp_settings['password'] is None:
+                pkey = _load_private_key(self.sftp_settings['key_filepath'], self.sftp_settings['key_passphrase'])
+            # DANGER: Without a known host key, any key is accepted
+            transport.connect(hostkey=next(iter(known_keys.values())) if known_keys is not None else None,
+                              username=self.sftp_settings['username'],
+                              password=self.sftp_settings['password'],
+                              pkey=pkey)
+            sftp_client = paramiko.SFTPClient.from_transport(transport)
+        except Exception:
+            transport.close()
+            raise
+
+        # Add host to known_hosts if not known yet
+        if known_keys is None:
+            server_key = transport.get_remote_server_key()
+            host_keys.add(hostname, server_key.get_name(), server_key)
+            # Create necessary directories if not yet available
+            if not os.path.exists(os.path.dirname(KNOWN_HOSTS_FILE)):
+                os.mkdir(os.path.dirname(KNOWN_HOSTS_FILE))
+            host_keys.save(KNOWN_HOSTS_FILE)
+
+        if cwd:
+            sftp_client.chdir(cwd)
+        return sftp_client
+
+    def _init_sftp(self) -> paramiko.SFTPClient:
         """Sets up the Connection to the SFTP server.
         
-        :return: An active connection object
-        :rtype: pysftp.Connection
+        :return: SFTP client of the main connection, closed together with the pool
+        :rtype: paramiko.SFTPClient
         """
         # SFTP Security: Check for known_hosts
-        sftp_cnopts = pysftp.CnOpts()
-        sftp_hosts = None
-        if sftp_cnopts.hostkeys.lookup(self.sftp_settings['hostname']) is None:
+        unknown_host = _load_host_keys().lookup(self.sftp_settings['hostname']) is None
+        if unknown_host:
             self.output_message("Unkown host {}. Any host key will be accepted.".format(self.sftp_settings['hostname']),
                                 messageType=Sdk.EngineMessageType.warning)
-            sftp_hosts = sftp_cnopts.hostkeys
-            # DANGER: Disable all key validation for all hosts
-            sftp_cnopts.hostkeys = None
 
         # Initiate connection
         try:
-            sftp_conn = pysftp.Connection(host=self.sftp_settings['hostname'],
-                                          port=self.sftp_settings['port'],
-                                          username=self.sftp_settings['username'],
-                                          password=self.sftp_settings['password'],
-                                          private_key=self.sftp_settings['key_filepath'],
-                                          private_key_pass=self.sftp_settings['key_passphrase'],
-                                          cnopts=sftp_cnopts)
-
-            # Add host to known_hosts if not known yet
-            if sftp_hosts != None:
+            sftp_conn = self._make_connection()
+            if unknown_host:
                 self.output_message("Connected to unknown host. Caching its hostkey to known_hosts.", messageType=Sdk.EngineMessageType.warning)
-                sftp_hosts.add(self.sftp_settings['hostname'], sftp_conn.remote_server_key.get_name(), sftp_conn.remote_server_key)
-                # Create necessary directories if not yet available
-                hosts_file = pysftp.helpers.known_hosts()
-                if not os.path.exists(os.path.dirname(hosts_file)):
-                    os.mkdir(os.path.dirname(hosts_file))
-                sftp_hosts.save(hosts_file)            
-        except pysftp.ConnectionException as e:
+        except (socket.gaierror, socket.timeout, ConnectionError):
             self.output_message("Could not connect to server. Please check settings.")
             return False
-        except pysftp.CredentialException as e:
-            self.output_message("Authentication failed. Please check credentials.")
-            return False
-        except pysftp.paramiko.BadAuthenticationType as e:
+        except paramiko.BadAuthenticationType as e:
             self.output_message("Unsupported Authentication Type: {}".format(e))
             return False
+        except paramiko.AuthenticationException:
+            self.output_message("Authentication failed. Please check credentials.")
+            return False
         except Exception as e:
             self.output_message("Connection error: {}".format(e))
             return False
@@ -203,54 +515,169 @@ class AyxPlugin:
         self.output_message("Connected successfully to {}".format(self.sftp_settings['hostname']), messageType=Sdk.EngineMessageType.info)
         try:
             sftp_conn.chdir(self.sftp_settings['remote_path'])
-        except IOError as e:
+        except IOError:
             self.output_message("Remote path does not exist: {}".format(self.sftp_settings['remote_path']))
+            _close_connection(sftp_conn)
             return False
+        # Normalized by chdir already, no need to ask the server again
+        self._remote_cwd = sftp_conn.getcwd()
+
+        # The main connection is not needed for anything else, so it is the first one used by the worker threads.
+        # Further connections are opened when needed, each one is another login on the server.
+        remote_cwd = self._remote_cwd
+        self.pool = SFTPConnectionPool(lambda: self._make_connection(remote_cwd), self.concurrency, [sftp_conn])
 
         return sftp_conn
 
+    @staticmethod
+    def _remote_exists(sftp_client: object, filename: str) -> bool:
+        """Checks whether a remote file exists.
+
+        :param sftp_client: SFTP channel
+        :type sftp_client: paramiko.SFTPClient
+        :param filename: Name of the remote file
+        :type filename: str
+        :rtype: bool
+        """
+        try:
+            sftp_client.stat(filename)
+        except IOError:
+            return False
+        return True
+
+    def _write_remote(self, sftp_client: object, source: object, filename: str):
+        """Writes a stream to a remote file, like putfo().
+
+        Unless existing files are to be overwritten, the remote file is opened exclusively. The
+        server then refuses to replace an existing file, so there is no need to check for it
+        beforehand, which would cost a round trip for every file.
+        :param sftp_client: SFTP channel
+        :type sftp_client: paramiko.SFTPClient
+        :param source: Binary stream to upload
+        :type source: io.RawIOBase
+        :param filename: Name of the remote file
+        :type filename: str
+        :raises FileExistsError: If the remote file exists and is not to be overwritten
+        :raises IOError: If the file could not be uploaded
+        """
+        try:
+            remote_f = sftp_client.open(filename, 'wb' if self.overwrite else 'wbx')
+        except IOError:
+            # SFTP v3 has no distinct status for existing files, so this is only checked on failure
+            if not self.overwrite and self._remote_exists(sftp_client, filename):
+                raise FileExistsError(filename)
+            raise
+
+        with remote_f:
+            # Do not wait for the server to acknowledge each write, errors are raised on close
+            remote_f.set_pipelined(True)
+            shutil.copyfileobj(source, remote_f, LOCAL_BUFFER_SIZE)
+            size = remote_f.tell()
+
+        # Same check as putfo()
+        remote_size = sftp_client.stat(filename).st_size
+        if remote_size != size:
+            raise IOError("size mismatch in put!  {} != {}".format(remote_size, size))
+
+    def _upload_worker(self, cur_fname: str, cur_fpath: str = None, cur_blob: bytes = None) -> tuple:
+        """Uploads a single local file or blob using a connection from the pool.
+
+        Does not call into the Alteryx engine, as it is not thread-safe. Messages are returned to
+        the caller instead, a successful upload is only reported by the returned flag.
+        :param cur_fname: Name of the remote file
+        :type cur_fname: str
+        :param cur_fpath: Path of the local file, for UPLOAD_FILES
+        :type cur_fpath: str
+        :param cur_blob: Data to upload, for UPLOAD_BLOBS
+        :type cur_blob: bytes
+        :return: Whether the upload succeeded, list of message text and message type
+        :rtype: bool, list
+        """
+        with self.pool.acquire() as conn:
+            try:
+                if cur_fpath is None:
+                    # BytesIO shares the buffer of the bytes object until written to, so the blob is not copied.
+                    # A NULL blob is uploaded as an empty file.
+                    self._write_remote(conn, io.BytesIO(cur_blob or b""), cur_fname)
+                else:
+                    # Read in whole chunks, a buffer would only copy them once more
+                    with open(cur_fpath, 'rb', buffering=0) as local_f:
+                        self._write_remote(conn, local_f, cur_fname)
+            except FileExistsError:
+                return False, [('File "{}{}" already exists. Skipped.'.format(self.sftp_settings['remote_path'], cur_fname), Sdk.EngineMessageType.warning)]
+            except (TypeError, IOError, paramiko.SSHException) as e:
+                return False, [('File "{}" could not be uploaded: {}'.format(cur_fname, e), Sdk.EngineMessageType.error)]
+
+        if cur_fpath is None:
+            return True, []
+
+        messages = list()
+        if self._delete_files:
+            # Delete current file
+            try:
+                os.remove(cur_fpath)
+            except Exception as e:
+                messages.append(('Could not delete "{}": {}'.format(cur_fpath, e), Sdk.EngineMessageType.error))
+        elif self._move_files:
+            # Move current file to target path
+            new_fpath = os.path.join(self.move_path, cur_fname)
+            try:
+                _move_local_file(cur_fpath, new_fpath)
+            except Exception as e:
+                messages.append(('Could not move "{}" to "{}": {}'.format(cur_fpath, new_fpath, e), Sdk.EngineMessageType.error))
+        return True, messages
+
     def pi_init(self, str_xml: str):
         """
         Called when the Alteryx engine is ready to provide the tool configuration from the GUI.
         :param str_xml: The raw XML from the GUI.
         """
-        xml = Et.fromstring(str_xml)
+        settings = self._parse_xml_settings(Et.fromstring(str_xml))
 
         # Getting the user-entered settings from the GUI
         # SFTP Settings
-        self.sftp_settings['hostname'] = self._prep_xmltext(xml, 'Hostname')
-        self.sftp_settings['port'] = int(self._prep_xmltext(xml, 'Port'))
-        self.sftp_settings['username'] = self._prep_xmltext(xml, 'Username')
-        self.sftp_settings['password'] = self._prep_xmltext(xml, 'Password')
-        self.sftp_settings['key_filepath'] = self._prep_xmltext(xml, 'KeyfilePath')
+        self.sftp_settings['hostname'] = settings.get('Hostname')
+        self.sftp_settings['port'] = int(settings.get('Port'))
+        self.sftp_settings['username'] = settings.get('Username')
+        self.sftp_settings['password'] = settings.get('Password')
+        self.sftp_settings['key_filepath'] = settings.get('KeyfilePath')
         if self.sftp_settings['key_filepath']:
-            self.sftp_settings['key_passphrase'] = self._prep_xmltext(xml, 'KeyfilePassphrase')
+            self.sftp_settings['key_passphrase'] = settings.get('KeyfilePassphrase')
         else:
             self.sftp_settings['key_passphrase'] = None
-        self.sftp_settings['remote_path'] = self._prep_xmltext(xml, 'RemotePath')
+        self.sftp_settings['remote_path'] = settings.get('RemotePath')
         # Add trailing slash
-        if self.sftp_settings['remote_path']:
-            if self.sftp_settings['remote_path'][len(self.sftp_settings['remote_path'])-1] != '/':
-                self.sftp_settings['remote_path'] += '/'
+        if self.sftp_settings['remote_path'] and not self.sftp_settings['remote_path'].endswith('/'):
+            self.sftp_settings['remote_path'] += '/'
         # Tool Mode
         self.upload_mode = {
             'upload_files': self.UploadMode.UPLOAD_FILES,
             'upload_blobs': self.UploadMode.UPLOAD_BLOBS
-        }.get(self._prep_xmltext(xml, 'UploadMode'), self.UploadMode.NONE_MODE)
+        }.get(settings.get('UploadMode'), self.UploadMode.NONE_MODE)
         # File Handling
         self.file_handling = {
             'keep_files': self.FileHandling.KEEP_FILES,
             'delete_files': self.FileHandling.DELETE_FILES,
             'move_files': self.FileHandling.MOVE_FILES
-        }.get(self._prep_xmltext(xml, 'FileHandling'), self.FileHandling.NONE_HANDLING)
-        self.move_path = self._prep_xmltext(xml, 'MovePath')
+        }.get(settings.get('FileHandling'), self.FileHandling.NONE_HANDLING)
+        # Checked for every file, plain attributes are cheaper than comparing enum members
+        self._upload_files = (self.upload_mode == self.UploadMode.UPLOAD_FILES)
+        self._upload_blobs = (self.upload_mode == self.UploadMode.UPLOAD_BLOBS)
+        self._delete_files = (self.file_handling == self.FileHandling.DELETE_FILES)
+        self._move_files = (self.file_handling == self.FileHandling.MOVE_FILES)
+        self.move_path = settings.get('MovePath')
         # Trailing slash
         if self.move_path:
             self.move_path = os.path.join(self.move_path, "")
-        self.overwrite = (self._prep_xmltext(xml, 'Overwrite') == 'True')
+        self.overwrite = (settings.get('Overwrite') == 'True')
+        # Number of parallel uploads, capped at MAX_CONCURRENCY
+        if settings.get('Concurrency'):
+            self.concurrency = min(max(int(settings.get('Concurrency')), 1), MAX_CONCURRENCY)
+        else:
+            self.concurrency = DEFAULT_CONCURRENCY
         # Incoming Settings
-        self.incoming_field = self._prep_xmltext(xml, 'IncomingField')
-        self.blob_field = self._prep_xmltext(xml, 'BlobField')
+        self.incoming_field = settings.get('IncomingField')
+        self.blob_field = settings.get('BlobField')
 
         # Validate settings
         self.validate_settings()
@@ -298,18 +725,15 @@ class AyxPlugin:
         self.alteryx_engine.output_message(self.n_tool_id, messageType, self.xmsg(text))
 
     @staticmethod
-    def _prep_xmltext(et: Et, key: str) -> str:
-        """Wrapper to quickly get settings.
+    def _parse_xml_settings(et: Et) -> dict:
+        """Reads all settings from the GUI at once.
         
         :param et: Element Tree from parsed Xml
         :type et: xml.etree.ElementTree
-        :param key: Name of the setting
-        :type key: str
-        :return: Parsed value for setting
-        :rtype: str
+        :return: Stripped value for each setting, None if empty
+        :rtype: dict
         """
-        t = et.find(key).text.strip() if et.findtext(key) and (et.find(key).text is not None) else None
-        return None if not t or t == "" else t
+        return {child.tag: (child.text.strip() if child.text else None) or None for child in et}
     
     @staticmethod
     def xmsg(msg_string: str) -> str:
@@ -341,8 +765,12 @@ class IncomingInterface:
         self.blob_field = None
         # SFTP Connection reference
         self.sftp_conn = None
+        # Uploads run in a thread pool, their messages are shown in the order of the incoming records
+        self.executor = None
+        self.pending = deque()
+        self.uploaded = MessageAggregator(self.ayx_plugin, 'Uploaded to {}:'.format(self.ayx_plugin.sftp_settings['remote_path']))
 
-        self.file_counter = 0
+        self.update_only = False
 
     def ii_init(self, record_info_in: object) -> bool:
         """
@@ -374,7 +802,8 @@ class IncomingInterface:
                 self.ayx_plugin.output_message('Field "{}" does not contain blobs.'.format(self.in_field.name))
                 return False
 
-        self.file_counter = 0
+        # Does not change during a run, so it is not asked for every record
+        self.update_only = (self.ayx_plugin.alteryx_engine.get_init_var(self.ayx_plugin.n_tool_id, 'UpdateOnly') == 'True')
 
         return True
 
@@ -384,89 +813,71 @@ class IncomingInterface:
         :param in_record: The data for the incoming record.
         :return: False if method calling limit is hit.
         """
-        if (in_record is None) or (self.ayx_plugin.alteryx_engine.get_init_var(self.ayx_plugin.n_tool_id, 'UpdateOnly') == 'True'):
+        if (in_record is None) or self.update_only:
             return False
+        plugin = self.ayx_plugin
 
         # Validate settings
-        if not self.ayx_plugin.validate_settings(silent=False):
+        if not plugin.validate_settings(silent=False):
             return False
         if not self.in_field:
             return False
 
         # If we do not yet have a connection, we need to connect
         if not self.sftp_conn:
-            self.sftp_conn = self.ayx_plugin._init_sftp()
+            self.sftp_conn = plugin._init_sftp()
             if not self.sftp_conn:
                 return False
-
+            self.executor = ThreadPoolExecutor(max_workers=plugin.concurrency)
 
         # Current file
-        if self.ayx_plugin.upload_mode == self.ayx_plugin.UploadMode.UPLOAD_FILES:
+        if plugin._upload_files:
             cur_fpath = self.in_field.get_as_string(in_record)
+            cur_stat = _stat_or_none(cur_fpath)
             # Check whether local file exists
-            if not os.path.exists(cur_fpath):
-                self.ayx_plugin.output_message('File "{}" does not exist.'.format(cur_fpath))
+            if cur_stat is None:
+                plugin.output_message('File "{}" does not exist.'.format(cur_fpath))
                 return True
             # Check whether file is actually a file
-            if not os.path.isfile(cur_fpath):
-                self.ayx_plugin.output_message('File "{}" is actually a folder. Please provide a file name.'.format(cur_fpath))
+            if not stat.S_ISREG(cur_stat.st_mode):
+                plugin.output_message('File "{}" is actually a folder. Please provide a file name.'.format(cur_fpath))
                 return True
 
             _, cur_fname = os.path.split(cur_fpath)
-            # Check whether remote file exists already
-            if self.sftp_conn.exists(cur_fname) and not self.ayx_plugin.overwrite:
-                self.ayx_plugin.output_message('File "{}{}" already exists. Skipped.'.format(self.ayx_plugin.sftp_settings['remote_path'], cur_fname),
-                                               messageType=Sdk.EngineMessageType.warning)
-                return True
-
-            # Upload file
-            try:
-                self.sftp_conn.put(cur_fpath)
-            except (IOError, OSError) as e:
-                self.ayx_plugin.output_message('File "{}" could not be uploaded: {}'.format(cur_fname, e))
-            else:
-                self.ayx_plugin.output_message('{} successfully uploaded to {}{}'.format(cur_fname, self.ayx_plugin.sftp_settings['remote_path'], cur_fname),
-                                               messageType=Sdk.Status.info)
-
-            if self.ayx_plugin.file_handling == self.ayx_plugin.FileHandling.DELETE_FILES:
-                # Delete current file
-                try:
-                    os.remove(cur_fpath)
-                except Exception as e:
-                    self.ayx_plugin.output_message('Could not delete "{}": {}'.format(cur_fpath, e))
-            elif self.ayx_plugin.file_handling == self.ayx_plugin.FileHandling.MOVE_FILES:
-                # Move current file to target path
-                new_fpath = os.path.join(self.ayx_plugin.move_path, cur_fname)
-                try:
-                    os.rename(cur_fpath, new_fpath)
-                except Exception as e:
-                    self.ayx_plugin.output_message('Could not move "{}" to "{}": {}'.format(cur_fpath, new_fpath, e))
-        elif self.ayx_plugin.upload_mode == self.ayx_plugin.UploadMode.UPLOAD_BLOBS:
+            # Upload file in the background
+            self.pending.append((cur_fname, self.executor.submit(plugin._upload_worker, cur_fname, cur_fpath=cur_fpath)))
+        elif plugin._upload_blobs:
             cur_fname = self.in_field.get_as_string(in_record)
             # Check whether file name is not empty
             if not cur_fname:
-                self.ayx_plugin.output_message('No filename provided. Cannot upload.')
-                return True
-            # Check whether remote file already exists
-            if self.sftp_conn.exists(cur_fname) and not self.ayx_plugin.overwrite:
-                self.ayx_plugin.output_message('File "{}{}" already exists. Skipped.'.format(self.ayx_plugin.sftp_settings['remote_path'], cur_fname),
-                                               messageType=Sdk.EngineMessageType.warning)
+                plugin.output_message('No filename provided. Cannot upload.')
                 return True
-            
+
+            # The record is only valid during this call, so the blob is read here
             cur_blob = self.blob_field.get_as_blob(in_record)
-            cur_datafo = io.BytesIO(cur_blob)
-            try:
-                self.sftp_conn.putfo(cur_datafo, cur_fname)
-            except (TypeError, IOError) as e:
-                self.ayx_plugin.output_message('Error uploading {}: {}'.format(cur_fname, e))
-            else:
-                self.ayx_plugin.output_message('{} successfully uploaded to {}{}'.format(cur_fname, self.ayx_plugin.sftp_settings['remote_path'], cur_fname),
-                                               messageType=Sdk.Status.info)
+            self.pending.append((cur_fname, self.executor.submit(plugin._upload_worker, cur_fname, cur_blob=cur_blob)))
 
-        self.file_counter += 1
+        # Do not let blobs waiting for upload pile up in memory
+        if len(self.pending) > 2 * plugin.concurrency:
+            self._complete_oldest()
 
         return True
 
+    def _complete_oldest(self):
+        """Waits for the oldest pending upload and shows its messages.
+
+        Called from the thread the Alteryx engine called us on only, as the SDK is not thread-safe.
+        """
+        cur_fname, future = self.pending.popleft()
+        try:
+            uploaded, messages = future.result()
+        except TRANSFER_ERRORS as e:
+            uploaded, messages = False, [('Error uploading {}: {}'.format(cur_fname, e), Sdk.EngineMessageType.error)]
+        if uploaded:
+            self.uploaded.add(cur_fname)
+        for text, message_type in messages:
+            self.ayx_plugin.output_message(text, messageType=message_type)
+
     def ii_update_progress(self, d_percent: float):
         """
         Called by the upstream tool to report what percentage of records have been pushed.
@@ -479,6 +890,16 @@ class IncomingInterface:
         Called when the incoming connection has finished passing all of its records.
         """
         if self.sftp_conn:
-            self.sftp_conn.close()
+            # Wait for the remaining uploads
+            while self.pending:
+                self._complete_oldest()
+            self.executor.shutdown()
+            self.executor = None
+            # Includes the main connection
+            self.ayx_plugin.pool.close_all()
             self.sftp_conn = None
+
+        self.uploaded.flush()
+        self.ayx_plugin.output_message("{} files uploaded to {}{}".format(self.uploaded.total, self.ayx_plugin.sftp_settings['hostname'], self.ayx_plugin.sftp_settings['remote_path']),
+                                       messageType=Sdk.Status.info)
     
\ No newline at end of file
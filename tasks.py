@@ -1,11 +1,15 @@
-import tempfile
-from typing import List
+from typing import TYPE_CHECKING, Callable, Iterator, List, Tuple
 
 from invoke import task
 import os, sys
-import shutil
-import subprocess
-import packaging_config.tool_names as tn
+import stat
+import contextlib
+from collections import deque
+from functools import lru_cache
+# Further modules are imported by the tasks needing them, so every invoke call starts quicker
+if TYPE_CHECKING:
+    import zipfile
+    from concurrent.futures import ThreadPoolExecutor
 
 # ---------------------------------------GLOBAL VARIABLES------------------------------------------#
 # Path to user plugins/tools
@@ -13,13 +17,9 @@ alteryx_engine = f"C:\\Program Files\\Alteryx\\bin\\AlteryxEngineCmd.exe"
 alteryx_miniconda = f"C:\\Program Files\\Alteryx\\bin\\Miniconda3\\python.exe"
 tool_base_dir = os.path.dirname(os.path.realpath(__file__))
 project_name = "SKOPOSSFTP_v1" # os.path.basename(tool_base_dir)
-
-try:
-    user_tools_path = os.path.join(f"{os.environ['APPDATA']}", "Alteryx", "Tools")
-except KeyError:
-    print(
-        "Not able to find APPDATA environment variable. This is expected on Linux/Gitlab CI"
-    )
+packaging_config_dir = os.path.join(tool_base_dir, "packaging_config")
+installer_config_path = os.path.join(packaging_config_dir, "Installer_Config.xml")
+requirements_path = os.path.join(tool_base_dir, "requirements.txt")
 
 try:
     user_tools_path = os.path.join(f"{os.environ['APPDATA']}", "Alteryx", "Tools")
@@ -28,59 +28,127 @@ except KeyError:
         "Not able to find APPDATA environment variable. This is expected on Linux/Gitlab CI"
     )
 snakeplane_path = os.path.join("..", "snakeplane")
+# Packaging tools of the environment, left out of requirements.txt like pip freeze does
+freeze_excluded_packages = frozenset({"pip", "setuptools", "wheel", "distribute"})
 extras = []
 
 
-def _make_list_of_ignored_files(files: List[str], full_names: List[str], suffix_list: List[str], pref_list: List[str]):
-    ignored_files: List[str] = full_names
-
-    for file in files:
-        for suffix in suffix_list:
-            if file.endswith(suffix):
-                ignored_files.append(file)
-        for pref in pref_list:
-            if file.startswith(pref):
-                ignored_files.append(file)
-    return ignored_files
+def _probe(path: str) -> Tuple[bool, bool]:
+    # One lstat() tells whether a path exists (even as broken link) and whether it is a link
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return False, False
+    return True, stat.S_ISLNK(st.st_mode)
 
 
+@lru_cache(maxsize=None)
 def _installer_exists():
-    return os.path.exists(f"{tool_base_dir}/packaging_config/Installer_Config.xml")
+    return os.path.exists(installer_config_path)
 
 
-def _copy_installer_to_temp(temp_dir: str):
-    shutil.copytree(f"{tool_base_dir}/packaging_config", f"{temp_dir}",
-                    ignore=lambda dir, file: ["Installer_Config.xml", "tool_names.py"])
-    shutil.copy(f"{tool_base_dir}/packaging_config/Installer_Config.xml", f"{temp_dir}/Config.xml")
+# files and directories to ignore for export
+excluded_full_file_names = frozenset({"Scripts", "Lib", "Include", ".idea", "env", ".gitignore", ".gitmodules", "tests"})
+excluded_suffixes = (".pyc", ".log", ".bat", ".sh")
+excluded_prefixes = (".git",)
+# files which are compressed already, they are stored in the installer as they are
+precompressed_suffixes = (".pyd", ".dll", ".so", ".whl", ".zip", ".png", ".jpg", ".jpeg", ".gz", ".xz", ".7z")
+
+
+def _is_excluded_from_packaging(name: str) -> bool:
+    # endswith/startswith check all suffixes/prefixes of a tuple at once
+    return name in excluded_full_file_names or name.endswith(excluded_suffixes) or name.startswith(excluded_prefixes)
+
+
+def _scandir_walk(root: str, is_ignored: Callable[[str], bool], rel_dir: str = "") -> Iterator[Tuple[str, str]]:
+    # DirEntry knows the file type from the directory listing already, no stat() per file needed.
+    # Yields absolute and relative path of every file which is not ignored.
+    with os.scandir(root) as entries:
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name)
+            if is_ignored(rel_path):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scandir_walk(entry.path, is_ignored, rel_path)
+            elif entry.is_file():
+                yield entry.path, rel_path
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_ahead(executor: "ThreadPoolExecutor", paths: List[str], depth: int) -> Iterator[bytes]:
+    # Yields the contents of the files in order, while up to depth further files are read in the background
+    pending = deque()
+    for path in paths:
+        pending.append(executor.submit(_read_file, path))
+        if len(pending) > depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _write_file_to_zip(zf: "zipfile.ZipFile", path: str, arcname: str, data: bytes = None):
+    import zipfile
+
+    # Deflating compressed data again costs CPU time without making the installer any smaller
+    compress_type = zipfile.ZIP_STORED if path.lower().endswith(precompressed_suffixes) else zipfile.ZIP_DEFLATED
+    if data is None:
+        zf.write(path, arcname=arcname, compress_type=compress_type)
+        return
+    # Same entry zf.write() would create, from contents read already
+    zinfo = zipfile.ZipInfo.from_file(path, arcname=arcname)
+    zinfo.compress_type = compress_type
+    zf.writestr(zinfo, data)
 
 
-# files and directories to ignore for export
-def _dirs_and_files_to_exclude_from_packaging(dir, files):
-    full_file_names = ["Scripts", "Lib", "Include", ".idea", "env", ".gitignore", ".gitmodules","tests"]
-    suffixes = [".pyc", ".log", ".bat", ".sh"]
-    prefixes = [".git"]
-    return _make_list_of_ignored_files(files=files, full_names=full_file_names, suffix_list=suffixes,
-                                       pref_list=prefixes)
+def _write_tree_to_zip(zf: "zipfile.ZipFile", src: str, arc_dir: str, is_ignored: Callable[[str], bool]):
+    # Files go straight from the source tree into the archive, without a copy in a temporary directory
+    for path, rel_path in _scandir_walk(src, is_ignored):
+        _write_file_to_zip(zf, path, os.path.join(arc_dir, rel_path))
 
 
-def _copy_tools_to_temp(tool_names: List[str], temp_dir: str):
-    for tool in tool_names:
-        print(f"Copy tool {tool} to installer...")
-        if not os.path.exists(f"{tool_base_dir}/{tool}"):
-            print(f"Tool {tool} does not Exist! It will be skipped")
-            continue
+def _write_installer_to_zip(zf: "zipfile.ZipFile"):
+    _write_tree_to_zip(zf, packaging_config_dir, "",
+                       is_ignored=lambda rel_path: rel_path in ("Installer_Config.xml", "tool_names.py"))
+    _write_file_to_zip(zf, installer_config_path, "Config.xml")
+
 
-        shutil.copytree(f"{tool_base_dir}/{tool}", f"{temp_dir}/{tool}",
-                        ignore=_dirs_and_files_to_exclude_from_packaging)
-        shutil.copy(f"{tool_base_dir}/requirements.txt", f"{temp_dir}/{tool}/requirements.txt")
+def _list_tool_files(tool: str) -> List[Tuple[str, str]]:
+    # Returns path and name in the archive of every file of a tool
+    # The tool's own requirements.txt is replaced by the one of the project
+    return [(path, os.path.join(tool, rel_path)) for path, rel_path in
+            _scandir_walk(os.path.join(tool_base_dir, tool),
+                          is_ignored=lambda rel_path: rel_path == "requirements.txt" or
+                                                      _is_excluded_from_packaging(os.path.basename(rel_path)))]
 
-def _create_intaller(temp_dir: str, installer_name: str):
-    shutil.make_archive(f"{tool_base_dir}/alteryx_installer/{installer_name}", "zip", f"{temp_dir}")
-    if os.path.exists(f"{tool_base_dir}/alteryx_installer/{installer_name}.yxi"):
-        os.remove(f"{tool_base_dir}/alteryx_installer/{installer_name}.yxi")
-    os.rename(f"{tool_base_dir}/alteryx_installer/{installer_name}.zip",
-              f"{tool_base_dir}/alteryx_installer/{installer_name}.yxi")
-    return f"{tool_base_dir}/alteryx_installer/{installer_name}.yxi"
+
+def _write_tools_to_zip(zf: "zipfile.ZipFile", tool_names: Tuple[str, ...], jobs: int):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # One directory listing instead of checking every tool on its own
+    with os.scandir(tool_base_dir) as entries:
+        present = {entry.name for entry in entries if entry.is_dir()}
+    for tool in tool_names:
+        if tool not in present:
+            print(f"Tool {tool} does not Exist! It will be skipped")
+    tools = [tool for tool in tool_names if tool in present]
+
+    # The tool trees are walked and their files read in parallel, waiting for the file system overlaps that
+    # way and with compressing the previous files. Writing to the archive is not thread-safe and zipfile
+    # deflates on the writing thread, so that happens here in the order of the tools.
+    jobs = max(1, jobs)
+    # Every tool gets the same requirements.txt, it is read only once
+    requirements = _read_file(requirements_path)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for tool, tool_files in zip(tools, executor.map(_list_tool_files, tools)):
+            print(f"Copy tool {tool} to installer...")
+            contents = _read_ahead(executor, [path for path, _ in tool_files], depth=2 * jobs)
+            for (path, arcname), data in zip(tool_files, contents):
+                _write_file_to_zip(zf, path, arcname, data)
+            _write_file_to_zip(zf, requirements_path, f"{tool}/requirements.txt", requirements)
 
 
 # ------------------------------------------------------------------------------------------------- #
@@ -88,24 +156,38 @@ def _create_intaller(temp_dir: str, installer_name: str):
 @task(
     help={
         "name": "Specified name for the yxi",
+        "jobs": "Number of tools processed in parallel",
     }
 )
-def package(c, name=project_name):
+def package(c, name=project_name, jobs=8):
     """
     Bundles a folder into a yxi
     """
+    import zipfile
+    import packaging_config.tool_names as tn
+
     tool_names = tn.tool_names
 
     if not _installer_exists():
         print(f"Installer Config not found. "
-              f"Expected configuration at: {tool_base_dir}/packaging_config/Installer_Config.xml")
+              f"Expected configuration at: {installer_config_path}")
         return
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_dir = os.path.join(temp_dir, "proj")
-        _copy_installer_to_temp(temp_dir=temp_dir)
-        _copy_tools_to_temp(tool_names=tool_names, temp_dir=temp_dir)
-        installer_path = _create_intaller(temp_dir=temp_dir, installer_name=project_name)
+    installer_path = os.path.join(tool_base_dir, "alteryx_installer", f"{project_name}.yxi")
+    # Written next to the installer first, a failed build must not leave a broken installer behind.
+    # os.replace() swaps it in with a single rename, even if the installer exists already.
+    partial_path = f"{installer_path}.part"
+    os.makedirs(os.path.dirname(installer_path), exist_ok=True)
+    try:
+        with zipfile.ZipFile(partial_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            _write_installer_to_zip(zf)
+            _write_tools_to_zip(zf, tool_names=tool_names, jobs=jobs)
+    except BaseException:
+        # The zip may not have been created at all, its error is the one to report
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, installer_path)
 
     print(f"Installer created: {installer_path} \nincluded tools: {tool_names}")
 
@@ -115,18 +197,15 @@ def debug(c, name):
     """
     Run's the tool's debug workflow in the console
     """
+    import subprocess
 
     workflow = f"./debug_workflows/{name}.yxmd"
 
     if not os.path.exists(workflow):
         print(f"{name}.yxmd does not exist.\nYou need to setup a debug workflow")
         return
-    subprocess.call(
-        [
-            "C:\\WINDOWS\\system32\\WindowsPowerShell\\v1.0\\powershell.exe",
-            f"& '{alteryx_engine}' {workflow}",
-        ]
-    )
+    # Run the engine directly, starting PowerShell just to launch it takes longer than some workflows
+    subprocess.call([alteryx_engine, workflow])
 
 
 @task
@@ -135,7 +214,23 @@ def freeze(c):
     Saves the workspaces current dependencies
     """
 
-    os.system(f"{tool_base_dir}/env/Scripts/pip.exe freeze > {tool_base_dir}/requirements.txt")
+    try:
+        from importlib.metadata import Distribution
+    except ImportError:
+        # importlib.metadata is part of the standard library from Python 3.8 on
+        from importlib_metadata import Distribution
+
+    # Read the metadata of the packages installed in the environment directly, instead of running pip in a shell
+    site_packages = os.path.join(tool_base_dir, "env", "Lib", "site-packages")
+    requirements = set()
+    for dist in Distribution.discover(path=[site_packages]):
+        name = dist.metadata['Name']
+        # Leftovers of broken installs have no metadata, pip freeze skips them as well
+        if not name or name.lower() in freeze_excluded_packages:
+            continue
+        requirements.add(f"{name}=={dist.version}")
+    with open(requirements_path, "w") as f:
+        f.write("".join(f"{requirement}\n" for requirement in sorted(requirements, key=str.lower)))
     print(f"requirements.txt updated.")
 
 
@@ -154,23 +249,24 @@ def link(c, tool_name, force=False):
     if not os.path.exists(tool_dir):
         print(f"No tool with name '{tool_name}' was found in directory '{tool_base_dir}'. Please check the spelling.")
         return
-    elif not os.path.exists(f"{tool_dir}/{tool_name}Config.xml"):
+    elif not os.path.exists(os.path.join(tool_dir, f"{tool_name}Config.xml")):
         print(f"No {tool_name}Config.xml found. Porject would not work in Alteryx")
         return
 
     target_dir = os.path.join(user_tools_path, tool_name)
-    if os.path.exists(target_dir):
+    target_exists, target_is_link = _probe(target_dir)
+    if target_exists:
 
         if force:
-            print("Remove old tool with same name ...", os.path.exists(target_dir), os.path.islink(target_dir))
-            if os.path.islink(target_dir):
+            print("Remove old tool with same name ...", target_exists, target_is_link)
+            if target_is_link:
                 os.remove(target_dir)
             else:
                 os.rmdir(target_dir)
 
-            assert (not os.path.exists(target_dir))
+            assert (not _probe(target_dir)[0])
 
-            print("Removed ", not os.path.exists(target_dir))
+            print("Removed ", target_dir)
         else:
             print(
                 f"Tool '{tool_name}' already exists in directory '{user_tools_path}'. add parameter -f to replace file.")
@@ -181,10 +277,11 @@ def link(c, tool_name, force=False):
     if not os.path.exists(env_dir):
         print("Warning: No 'env' directory available could not link environment")
     else:
-        for dir in ["Scripts", "Include", "Lib"]:
-            dir_path = os.path.join(tool_dir, dir)
-
-            if os.path.exists(dir_path) or os.path.islink(dir_path):
+        # One directory listing instead of probing every link, it includes broken links as well
+        with os.scandir(tool_dir) as entries:
+            existing = {entry.name for entry in entries}
+        for dir in ("Scripts", "Include", "Lib"):
+            if dir in existing:
                 print(f"{dir} already exists.")
             else:
                 os.symlink(os.path.join(env_dir, dir), os.path.join(tool_dir, dir))